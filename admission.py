@@ -0,0 +1,155 @@
+"""
+Admission Control
+Tracks in-flight prediction work and recent latency, and decides how much of
+each response the API can afford to compute when it is overloaded.
+
+Degradation levels (each includes the ones before it):
+    0 full             - scores plus SHAP top_features
+    1 no_explanations  - scores only, top_features dropped
+    2 cached_only      - only results already in the prediction cache
+    3 reject           - 503 with Retry-After (cached results are still served)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+DEGRADATION_LEVELS = ["full", "no_explanations", "cached_only", "reject"]
+FULL, NO_EXPLANATIONS, CACHED_ONLY, REJECT = range(len(DEGRADATION_LEVELS))
+
+DEFAULT_INFLIGHT_THRESHOLDS = (8, 16, 32)
+DEFAULT_LATENCY_MS_THRESHOLDS = (1000.0, 2500.0, 5000.0)
+
+
+def _parse_thresholds(value: Optional[str], default: Sequence[float], cast=float) -> Tuple:
+    """Parse "a,b,c" into three ascending thresholds for levels 1-3"""
+    if not value:
+        return tuple(default)
+    parts = tuple(cast(v) for v in value.split(","))
+    if len(parts) != 3 or list(parts) != sorted(parts):
+        raise ValueError(f"Expected three ascending comma-separated thresholds, got '{value}'")
+    return parts
+
+
+class AdmissionController:
+    """
+    Picks a degradation level from the number of requests in flight and an
+    exponentially weighted moving average of recent request latency,
+    whichever is worse.
+
+    The latency average also halves every latency_half_life_s seconds.
+    Rejected requests never report a latency, so without this decay one burst
+    of slow requests could hold the controller at REJECT indefinitely.
+    """
+
+    def __init__(self, inflight_thresholds: Sequence[int] = DEFAULT_INFLIGHT_THRESHOLDS,
+                 latency_ms_thresholds: Sequence[float] = DEFAULT_LATENCY_MS_THRESHOLDS,
+                 ewma_alpha: float = 0.2, retry_after: int = 5, latency_half_life_s: float = 5.0):
+        self.inflight_thresholds = tuple(inflight_thresholds)
+        self.latency_ms_thresholds = tuple(latency_ms_thresholds)
+        self.ewma_alpha = ewma_alpha
+        self.retry_after = retry_after
+        self.latency_half_life_s = latency_half_life_s
+        self.in_flight = 0
+        self.latency_ewma_ms = 0.0
+        self.rejected = 0
+        self._latency_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Build a controller from SHED_* environment variables"""
+        return cls(
+            inflight_thresholds=_parse_thresholds(
+                os.getenv("SHED_INFLIGHT_THRESHOLDS"), DEFAULT_INFLIGHT_THRESHOLDS, int),
+            latency_ms_thresholds=_parse_thresholds(
+                os.getenv("SHED_LATENCY_MS_THRESHOLDS"), DEFAULT_LATENCY_MS_THRESHOLDS),
+            retry_after=int(os.getenv("SHED_RETRY_AFTER", 5)),
+            latency_half_life_s=float(os.getenv("SHED_LATENCY_HALF_LIFE_S", 5.0)),
+        )
+
+    def _decay(self):
+        """Fade the latency average by the time since it was last updated"""
+        now = time.monotonic()
+        if self.latency_half_life_s > 0:
+            self.latency_ewma_ms *= 0.5 ** ((now - self._latency_at) / self.latency_half_life_s)
+        self._latency_at = now
+
+    def _level_for(self, in_flight: int) -> int:
+        self._decay()
+        level = FULL
+        for i, threshold in enumerate(self.inflight_thresholds, start=1):
+            if in_flight > threshold:
+                level = i
+        for i, threshold in enumerate(self.latency_ms_thresholds, start=1):
+            if self.latency_ewma_ms > threshold:
+                level = max(level, i)
+        return level
+
+    def level(self) -> int:
+        """Current degradation level, without admitting anything"""
+        with self._lock:
+            return self._level_for(self.in_flight)
+
+    def enter(self) -> int:
+        """
+        Admit one request and return the degradation level it should be served at.
+        Rejected requests (REJECT) are not counted as in flight; others must call exit().
+        """
+        with self._lock:
+            level = self._level_for(self.in_flight + 1)
+            if level == REJECT:
+                self.rejected += 1
+            else:
+                self.in_flight += 1
+            return level
+
+    def exit(self, latency_ms: Optional[float]):
+        """
+        Release an admitted request and fold its latency into the moving average
+        Pass None for requests whose latency is not representative (e.g. profiled ones)
+        """
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if latency_ms is not None:
+                self._decay()
+                self.latency_ewma_ms += self.ewma_alpha * (latency_ms - self.latency_ewma_ms)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "degradation_level": DEGRADATION_LEVELS[self._level_for(self.in_flight)],
+                "in_flight": self.in_flight,
+                "latency_ewma_ms": round(self.latency_ewma_ms, 1),
+                "rejected": self.rejected,
+            }
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of computed prediction results"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
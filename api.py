@@ -3,16 +3,24 @@ Chef's Kiss API
 FastAPI backend for predicting restaurant success by location
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, Field
-from typing import List, Optional
-import pandas as pd
-import joblib
-import numpy as np
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, Dict, List, Optional
 from pathlib import Path
-import shap
+import hashlib
+import os
+import threading
+import time
 from constants import RESTAURANT_SUBTYPES, AVAILABLE_ZIP_CODES, get_cities, get_zip_codes_for_city
+from request_log import RequestLogger, RequestLogMiddleware
+from admission import AdmissionController, PredictionCache, DEGRADATION_LEVELS, FULL, NO_EXPLANATIONS, CACHED_ONLY, REJECT
+from profiling import ProfileGate, RequestProfiler
+from http_cache import (NO_STORE, REVALIDATE, WeakenEncodedETagMiddleware, cached_json, etag_matches, make_etag,
+                        not_modified, public_max_age)
 
 # FastAPI app
 app = FastAPI(
@@ -33,6 +41,41 @@ model = None
 zip_context_df = None
 df_final = None
 shap_explainer = None
+context_matrix = None
+competition_store = None
+zip_index = None
+MODEL_VERSION = None
+DATA_VERSION = None
+
+# optional request log, enabled by setting REQUEST_LOG_PATH
+request_logger = RequestLogger.from_env()
+if request_logger is not None:
+    app.add_middleware(RequestLogMiddleware, logger=request_logger, model_version=lambda: MODEL_VERSION)
+
+# compress large responses: brotli when available (falls back to gzip per client), else gzip
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=1000)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+# compressed responses get weak ETags so each encoding has a valid validator (must wrap compression)
+app.add_middleware(WeakenEncodedETagMiddleware)
+
+# Cache-Control max-age for GET /predict and the static city/subtype lists
+PREDICT_MAX_AGE = int(os.getenv("PREDICT_MAX_AGE", 3600))
+LISTS_MAX_AGE = int(os.getenv("LISTS_MAX_AGE", 86400))
+
+# load shedding: degrade /predict responses as in-flight work and latency grow
+admission = AdmissionController.from_env()
+prediction_cache = PredictionCache(int(os.getenv("PREDICTION_CACHE_SIZE", 1024)))
+
+# on-demand profiling of /predict, off unless PROFILE_TOKEN or PROFILE_SAMPLE_RATE is set
+profile_gate = ProfileGate.from_env()
+
+# /predict/nearby: zip codes returned when only a point is given, and the hard cap
+NEARBY_DEFAULT_K = 10
+NEARBY_MAX_K = 100
 
 # request response models
 class CityOpportunityRequest(BaseModel):
@@ -56,73 +99,278 @@ class OpportunityResponse(BaseModel):
     price_range: float
     total_zip_codes: int
     zip_scores: List[ZipCodeScore]
+    degradation_level: str = "full"
+
+class NearbyZipCodeScore(ZipCodeScore):
+    distance_miles: float
+
+class NearbyOpportunityResponse(BaseModel):
+    latitude: float
+    longitude: float
+    radius_miles: Optional[float]
+    k: int
+    subtype: str
+    price_range: float
+    total_zip_codes: int
+    zip_scores: List[NearbyZipCodeScore]
+    degradation_level: str = "full"
+
+class CompetitionRequest(BaseModel):
+    city: Optional[str] = Field(None, example="Philadelphia", description="City to look up (ignored if zip_codes is given)")
+    state: Optional[str] = Field(None, example="PA", description="Optional state code for disambiguation")
+    zip_codes: Optional[List[str]] = Field(None, example=["19103", "19104"])
+    subtypes: Optional[List[str]] = Field(None, example=["Italian", "Pizza"])
+    min_competitor_count: Optional[int] = Field(None, ge=0)
+    max_competitor_count: Optional[int] = Field(None, ge=0)
+    min_avg_stars: Optional[float] = Field(None, ge=0.0, le=5.0)
+    max_avg_stars: Optional[float] = Field(None, ge=0.0, le=5.0)
+    min_subtype_market_share: Optional[float] = Field(None, ge=0.0, le=1.0)
+    max_subtype_market_share: Optional[float] = Field(None, ge=0.0, le=1.0)
+    min_rating_advantage: Optional[float] = None
+    max_rating_advantage: Optional[float] = None
+    sort_by: str = Field("competitor_count", example="competitor_count")
+    descending: bool = True
+    limit: int = Field(100, ge=1, le=10000)
+
+class CompetitorProfile(BaseModel):
+    zip_code: str
+    city: str
+    subtype: str
+    competitor_count: int
+    avg_stars: Optional[float]
+    avg_review_count: Optional[float]
+    avg_price_range: Optional[float]
+    pct_open: Optional[float]
+    avg_review_rating: Optional[float]
+    avg_business_age: Optional[float]
+    total_restaurants: int
+    overall_avg_stars: Optional[float]
+    overall_avg_reviews: Optional[float]
+    restaurant_diversity: int
+    total_population: Optional[float]
+    median_age: Optional[float]
+    pct_white: Optional[float]
+    pct_black: Optional[float]
+    pct_asian: Optional[float]
+    pct_hispanic: Optional[float]
+    competition_density: Optional[float]
+    subtype_market_share: Optional[float]
+    rating_advantage: Optional[float]
+    population_per_restaurant: Optional[float]
+
+class CompetitionResponse(BaseModel):
+    city: Optional[str]
+    state: Optional[str]
+    total_results: int
+    competitors: List[CompetitorProfile]
 
 class HealthResponse(BaseModel):
     status: str
+    ready: bool
     model_loaded: bool
     data_loaded: bool
     total_zip_codes: int
     available_subtypes: List[str]
+    stages: Dict[str, str]
+    stage_seconds: Dict[str, float]
+    load: dict
+
+# startup stages, loaded in this order on a background thread so the server
+# can answer health checks while heavy dependencies and data load
+STARTUP_STAGES = ["model", "context", "fast_path", "competition", "zip_index", "explainer"]
+REQUIRED_STAGES = ["model", "context"]  # minimum needed to serve /predict
+stage_status = {name: "pending" for name in STARTUP_STAGES}
+stage_seconds = {}
+
+# set ENABLE_SHAP=0 for prediction-only processes (shap is then never imported)
+ENABLE_SHAP = os.getenv("ENABLE_SHAP", "1") != "0"
+
+def load_model_stage():
+    """Load the trained model pipeline"""
+    global model, MODEL_VERSION
+    import joblib
+    
+    model_path = Path("model/xgboost_untuned_model.pkl")
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model file not found: {model_path}")
+    model = joblib.load(model_path)
+    MODEL_VERSION = f"{model_path.stem}-{hashlib.sha256(model_path.read_bytes()).hexdigest()[:12]}"
+    print(f"[OK] Model loaded from {model_path} (version {MODEL_VERSION})")
+
+def load_context_stage():
+    """Load the preprocessed data and build the per-zip context lookup"""
+    global df_final, zip_context_df, DATA_VERSION
+    import pandas as pd
+    
+    data_path = Path("restaurant_row_data.csv")
+    if not data_path.exists():
+        raise FileNotFoundError(f"Data file not found: {data_path}")
+    df_final = pd.read_csv(data_path, dtype={'zip_code': str})
+    DATA_VERSION = f"{data_path.stem}-{hashlib.sha256(data_path.read_bytes()).hexdigest()[:12]}"
+    print(f"Data loaded: {df_final.shape} (version {DATA_VERSION})")
+    
+    #create context lookup table
+    user_input_cols = ['subtype', 'price_range', 'five_year_survivor']
+    context_cols = [c for c in df_final.columns if c not in user_input_cols]
+    zip_context_df = df_final[context_cols].drop_duplicates(subset=['zip_code']).set_index('zip_code')
+    print(f"Context lookup created for {len(zip_context_df)} zip codes")
+    print(f"[OK] Constants loaded: {len(RESTAURANT_SUBTYPES)} subtypes, {len(AVAILABLE_ZIP_CODES)} zip codes")
+
+def build_fast_path_stage():
+    """Pre-arrange zip context rows in model input order so a whole city scores in one predict_proba call"""
+    global context_matrix
+    if model is None or zip_context_df is None:
+        raise RuntimeError("model and context must be loaded first")
+    
+    feature_order = list(model.named_steps['preprocessor'].feature_names_in_)
+    matrix = zip_context_df.copy()
+    matrix['zip_code'] = matrix.index
+    matrix['subtype'] = ""
+    matrix['price_range'] = 0.0
+    context_matrix = matrix[feature_order]
+    print(f"[OK] Fast-path matrix built: {context_matrix.shape}")
+
+def load_competition_stage():
+    """Load zip x subtype competition statistics"""
+    global competition_store
+    from competition import CompetitionStore
+    
+    competition_store = CompetitionStore.from_csv("output.csv")
+    print(f"[OK] Competition store loaded: {len(competition_store)} zip/subtype rows")
+
+def load_zip_index_stage():
+    """Load ZIP centroids for nearest-ZIP search, keeping only zip codes the model can score"""
+    global zip_index
+    if zip_context_df is None:
+        raise RuntimeError("context must be loaded first")
+    from zip_index import ZipIndex
+    
+    zip_index = ZipIndex.load("zip_centroids.npz").subset(zip_context_df.index)
+    print(f"[OK] ZIP index loaded: {len(zip_index)} zip codes")
+
+def load_explainer_stage():
+    """Initialize the SHAP explainer"""
+    global shap_explainer
+    if model is None or df_final is None:
+        raise RuntimeError("model and context must be loaded first")
+    import shap
+    
+    xgb_model = model.named_steps['model']
+    background = df_final.sample(min(50, len(df_final)), random_state=42)
+    bg_processed = model.named_steps['preprocessor'].transform(
+        background.drop(columns=['five_year_survivor'])
+    )
+    shap_explainer = shap.TreeExplainer(xgb_model, bg_processed)
+    print("[OK] SHAP explainer initialized")
+
+STAGE_LOADERS = {
+    "model": load_model_stage,
+    "context": load_context_stage,
+    "fast_path": build_fast_path_stage,
+    "competition": load_competition_stage,
+    "zip_index": load_zip_index_stage,
+    "explainer": load_explainer_stage,
+}
+
+def run_startup_stages():
+    """Run every startup stage in order, recording status and duration of each"""
+    print("Loading model and data...")
+    for name in STARTUP_STAGES:
+        if name == "explainer" and not ENABLE_SHAP:
+            stage_status[name] = "disabled"
+            print("[OK] SHAP explainer disabled (ENABLE_SHAP=0)")
+            continue
+        stage_status[name] = "loading"
+        t0 = time.perf_counter()
+        try:
+            STAGE_LOADERS[name]()
+            stage_status[name] = "ready"
+        except Exception as e:
+            stage_status[name] = "failed"
+            print(f"[WARNING] Startup stage '{name}' failed: {e}")
+        stage_seconds[name] = round(time.perf_counter() - t0, 3)
+    print(f"[OK] Startup complete! ({sum(stage_seconds.values()):.2f}s)")
+
+def is_ready() -> bool:
+    """True once every stage required for predictions has loaded"""
+    return all(stage_status[name] == "ready" for name in REQUIRED_STAGES)
+
+def explanations_unavailable() -> bool:
+    """True while SHAP is enabled but the explainer is not ready (still loading or failed)"""
+    return ENABLE_SHAP and stage_status["explainer"] != "ready"
 
 #starting event
 @app.on_event("startup")
 async def load_model_and_data():
-    """Load the trained model and preprocessed data on startup"""
-    global model, zip_context_df, df_final, shap_explainer
+    """Start loading the model and data in the background and return immediately"""
+    if request_logger is not None:
+        request_logger.start()
+        print(f"[OK] Request log enabled: {request_logger.path}")
     
-    try:
-        print("Loading model and data...")
-        
-        #load model
-        model_path = Path("model/xgboost_untuned_model.pkl")
-        if not model_path.exists():
-            raise FileNotFoundError(f"Model file not found: {model_path}")
-        model = joblib.load(model_path)
-        print(f"[OK] Model loaded from {model_path}")
-        
-        #load preprocessed data
-        data_path = Path("restaurant_row_data.csv")
-        if not data_path.exists():
-            raise FileNotFoundError(f"Data file not found: {data_path}")
-        df_final = pd.read_csv(data_path, dtype={'zip_code': str})
-        print(f"Data loaded: {df_final.shape}")
-        
-        #create context lookup table
-        user_input_cols = ['subtype', 'price_range', 'five_year_survivor']
-        context_cols = [c for c in df_final.columns if c not in user_input_cols]
-        zip_context_df = df_final[context_cols].drop_duplicates(subset=['zip_code']).set_index('zip_code')
-        print(f"Context lookup created for {len(zip_context_df)} zip codes")
-        
-        print(f"[OK] Constants loaded: {len(RESTAURANT_SUBTYPES)} subtypes, {len(AVAILABLE_ZIP_CODES)} zip codes")
-        
-        # Initialize SHAP explainer
-        try:
-            xgb_model = model.named_steps['model']
-            background = df_final.sample(min(50, len(df_final)), random_state=42)
-            bg_processed = model.named_steps['preprocessor'].transform(
-                background.drop(columns=['five_year_survivor'])
-            )
-            shap_explainer = shap.TreeExplainer(xgb_model, bg_processed)
-            print("[OK] SHAP explainer initialized")
-        except Exception as e:
-            print(f"[WARNING] SHAP explainer not available: {e}")
-            shap_explainer = None
-        
-        print("[OK] Startup complete!")  
-    except Exception as e:
-        raise
+    threading.Thread(target=run_startup_stages, name="startup-stages", daemon=True).start()
+
+@app.on_event("shutdown")
+async def flush_request_log():
+    """Flush any buffered request log records before exiting"""
+    if request_logger is not None:
+        request_logger.close()
+
+def load_stats() -> dict:
+    """Admission control stats, plus records the request log has dropped when it is enabled"""
+    stats = admission.stats()
+    if request_logger is not None:
+        stats["request_log_dropped"] = request_logger.dropped
+    return stats
 
 # Health check endpoint
 @app.get("/", response_model=HealthResponse)
-async def health_check():
-    """Health check endpoint - verify API is running and model is loaded"""
-    return {
-        "status": "healthy",
+async def health_check(request: Request):
+    """Health check endpoint - verify API is running and report which startup stages are loaded"""
+    ready = is_ready()
+    if ready:
+        status = "healthy"
+    elif any(stage_status[name] == "failed" for name in REQUIRED_STAGES):
+        status = "unhealthy"
+    else:
+        status = "starting"
+    content = {
+        "status": status,
+        "ready": ready,
         "model_loaded": model is not None,
         "data_loaded": df_final is not None,
         "total_zip_codes": len(AVAILABLE_ZIP_CODES),
-        "available_subtypes": RESTAURANT_SUBTYPES
+        "available_subtypes": RESTAURANT_SUBTYPES,
+        "stages": stage_status,
+        "stage_seconds": stage_seconds,
+        "load": load_stats()
     }
+    # clients may keep a copy but must revalidate; unchanged status comes back as 304
+    return cached_json(request, content, REVALIDATE)
+
+# Available cities
+@app.get("/cities")
+async def list_cities(request: Request):
+    """List the cities that can be passed to /predict"""
+    return cached_json(request, {"cities": get_cities()}, public_max_age(LISTS_MAX_AGE))
+
+# Available restaurant subtypes
+@app.get("/subtypes")
+async def list_subtypes(request: Request):
+    """List the restaurant subtypes the model was trained on"""
+    return cached_json(request, {"subtypes": RESTAURANT_SUBTYPES}, public_max_age(LISTS_MAX_AGE))
+
+# Liveness probe - the process is up and serving requests
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe - always OK while the event loop is responsive"""
+    return {"status": "alive"}
+
+# Readiness probe - predictions can be served
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe - 200 once the model and context data are loaded, 503 before that"""
+    body = {"ready": is_ready(), "stages": stage_status}
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
 
 # Feature name mapping for consumer-friendly display
 def map_feature_name(technical_name: str) -> str:
@@ -236,8 +484,50 @@ def compute_shap(input_row):
         print(f"SHAP computation error: {e}")
         return None
 
+# Helper function: Turn a predicted probability into a zip score entry
+def build_zip_score(zip_code: str, probability: float, subtype: str, price_range: float) -> dict:
+    """Format a survival probability as an opportunity score with a rating label"""
+    probability = float(probability)
+    score_percent = round(probability * 100, 1)
+    
+    if score_percent >= 70:
+        rating = "High Opportunity"
+    elif score_percent >= 50:
+        rating = "Moderate Opportunity"
+    else:
+        rating = "Low Opportunity"
+    
+    return {
+        "zip_code": zip_code,
+        "opportunity_score": round(probability, 4),
+        "score_percent": score_percent,
+        "rating": rating,
+        "restaurant_type": f"{subtype} (Price: {'$' * int(price_range)})"
+    }
+
+# Helper function: Build the model input row for one zip code
+def build_input_row(zip_code: str, subtype: str, price_range: float):
+    """One-row model input for a zip code from the context lookup"""
+    import pandas as pd
+    
+    context_data = zip_context_df.loc[zip_code].copy()
+    
+    input_row = pd.DataFrame([context_data])
+    input_row['zip_code'] = zip_code
+    input_row['subtype'] = subtype
+    input_row['price_range'] = float(price_range)
+    return input_row
+
+# Helper function: Build model input rows for many zip codes
+def build_input_rows(zip_codes: List[str], subtype: str, price_range: float):
+    """Model input rows for several zip codes, sliced from the fast-path matrix"""
+    input_rows = context_matrix.loc[zip_codes].copy()
+    input_rows['subtype'] = subtype
+    input_rows['price_range'] = float(price_range)
+    return input_rows
+
 # Helper function: Predict opportunity score for a single zip code
-def predict_single_zip(zip_code: str, subtype: str, price_range: float) -> Optional[dict]:
+def predict_single_zip(zip_code: str, subtype: str, price_range: float, explain: bool = True) -> Optional[dict]:
     """
     Predict opportunity score for a single zip code
     Returns None if prediction fails
@@ -248,35 +538,13 @@ def predict_single_zip(zip_code: str, subtype: str, price_range: float) -> Optio
         if zip_code not in zip_context_df.index:
             return None
         
-
-        context_data = zip_context_df.loc[zip_code].copy()
-        
-
-        input_row = pd.DataFrame([context_data])
-        input_row['zip_code'] = zip_code
-        input_row['subtype'] = subtype
-        input_row['price_range'] = float(price_range)
+        input_row = build_input_row(zip_code, subtype, price_range)
 
         probability = model.predict_proba(input_row)[0][1]
-        score_percent = round(probability * 100, 1)
-        
-        if score_percent >= 70:
-            rating = "High Opportunity"
-        elif score_percent >= 50:
-            rating = "Moderate Opportunity"
-        else:
-            rating = "Low Opportunity"
-        
-        result = {
-            "zip_code": zip_code,
-            "opportunity_score": round(probability, 4),
-            "score_percent": score_percent,
-            "rating": rating,
-            "restaurant_type": f"{subtype} (Price: {'$' * int(price_range)})"
-        }
+        result = build_zip_score(zip_code, probability, subtype, price_range)
         
         # Add SHAP values if explainer is available
-        if shap_explainer:
+        if explain and shap_explainer:
             result["top_features"] = compute_shap(input_row)
         
         return result
@@ -285,10 +553,219 @@ def predict_single_zip(zip_code: str, subtype: str, price_range: float) -> Optio
         print(f"Error predicting for zip {zip_code}: {e}")
         return None
 
+# Helper function: Predict opportunity scores for many zip codes at once
+def predict_zip_batch(zip_codes: List[str], subtype: str, price_range: float, explain: bool = True) -> List[dict]:
+    """
+    Score every known zip code in one predict_proba call using the fast-path matrix
+    Unknown zip codes are skipped, matching predict_single_zip
+    """
+    zip_codes = [str(z).strip() for z in zip_codes]
+    zip_codes = [z for z in zip_codes if z in context_matrix.index]
+    if not zip_codes:
+        return []
+    
+    input_rows = build_input_rows(zip_codes, subtype, price_range)
+    
+    probabilities = model.predict_proba(input_rows)[:, 1]
+    
+    results = []
+    for i, (zip_code, probability) in enumerate(zip(zip_codes, probabilities)):
+        result = build_zip_score(zip_code, probability, subtype, price_range)
+        if explain and shap_explainer:
+            result["top_features"] = compute_shap(input_rows.iloc[[i]])
+        results.append(result)
+    return results
+
+# Helper function: Score a city's zip codes at a given degradation level
+def score_city(zip_codes: List[str], subtype: str, price_range: float, level: int,
+               use_cache: bool = True) -> Optional[List[dict]]:
+    """
+    Score zip codes, reusing cached results where possible
+    Above FULL, top_features are dropped; at CACHED_ONLY nothing new is computed
+    use_cache=False recomputes whenever the level allows it (used when profiling)
+    Returns None on a cache miss at CACHED_ONLY
+    """
+    key = (MODEL_VERSION, DATA_VERSION, tuple(zip_codes), subtype, float(price_range))
+    cached = prediction_cache.get(key)
+    if cached is not None and (use_cache or level >= CACHED_ONLY):
+        results, explained = cached
+        if level > FULL:
+            return [{k: v for k, v in r.items() if k != "top_features"} for r in results]
+        if explained or shap_explainer is None:
+            return results
+    
+    if level >= CACHED_ONLY:
+        return None
+    
+    explain = level == FULL
+    results = None
+    if context_matrix is not None:
+        try:
+            results = predict_zip_batch(zip_codes, subtype, price_range, explain)
+        except Exception as e:
+            print(f"Batch prediction failed, falling back to per-zip: {e}")
+    
+    if results is None:
+        results = []
+        for zip_code in zip_codes:
+            prediction = predict_single_zip(zip_code, subtype, price_range, explain)
+            if prediction:
+                results.append(prediction)
+    
+    if results:
+        prediction_cache.put(key, (results, explain and shap_explainer is not None))
+    return results
+
+
+# Shared prediction logic for the /predict routes
+async def run_prediction(resolve_zip_codes: Callable[[], List[str]], subtype: str, price_range: float,
+                         response: Response, profile_reason: Optional[str], profile_request: dict):
+    """
+    Resolve zip codes and score them under admission control
+    resolve_zip_codes raises HTTPException when there is nothing to score
+    Returns (results, degradation level) or raises HTTPException
+    When profile_reason is set the call is profiled and the profile id is sent in X-Profile-Id
+    """
+    
+    if model is None or df_final is None or zip_context_df is None:
+        raise HTTPException(status_code=503, detail="Model or data not loaded")
+    
+    profiler = RequestProfiler.try_start(profile_targets(), profile_reason) if profile_reason else None
+    try:
+        if profiler:
+            zip_codes = profiler.run(resolve_zip_codes)
+        else:
+            zip_codes = resolve_zip_codes()
+        
+        retry_headers = {"Retry-After": str(admission.retry_after)}
+        level = admission.enter()
+        if level == FULL and explanations_unavailable():
+            # without the explainer this is not the full response, so it must not be cached as one
+            level = NO_EXPLANATIONS
+        if level == REJECT:
+            # not admitted, but a result that is already cached costs nothing to hand out
+            results = score_city(zip_codes, subtype, price_range, CACHED_ONLY)
+            if results is None:
+                raise HTTPException(status_code=503, detail="Server overloaded, please retry later", headers=retry_headers)
+            level = CACHED_ONLY
+        else:
+            t0 = time.perf_counter()
+            try:
+                if profiler:
+                    results = await run_in_threadpool(
+                        profiler.run, score_city, zip_codes, subtype, price_range, level, False
+                    )
+                else:
+                    results = await run_in_threadpool(score_city, zip_codes, subtype, price_range, level)
+            finally:
+                # profiled latency includes profiler overhead, keep it out of load shedding
+                admission.exit(None if profiler else (time.perf_counter() - t0) * 1000)
+    finally:
+        if profiler:
+            profile = profiler.finish()
+            profile["request"] = profile_request
+            profile_gate.store(profile)
+            response.headers["X-Profile-Id"] = profile["id"]
+            response.headers["Cache-Control"] = NO_STORE
+    
+    if results is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Server overloaded and no cached result for this request, please retry later",
+            headers=retry_headers
+        )
+    
+    if not results:
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to generate predictions for any zip codes"
+        )
+    
+    return results, level
+
+async def run_city_prediction(city: str, state: Optional[str], subtype: str, price_range: float,
+                              response: Response, profile_reason: Optional[str] = None):
+    """
+    Score every zip code in a city
+    Returns (response content, degradation level) or raises HTTPException
+    """
+    
+    def resolve_zip_codes():
+        zip_codes = get_zip_codes_for_city(city, state)
+        if not zip_codes:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No zip codes found for city: {city}" + 
+                       (f", {state}" if state else "") +
+                       ". Try adding a state code or check /cities for available cities."
+            )
+        return zip_codes
+    
+    results, level = await run_prediction(
+        resolve_zip_codes, subtype, price_range, response, profile_reason,
+        {"city": city, "state": state, "subtype": subtype, "price_range": price_range}
+    )
+    
+    content = {
+        "city": city,
+        "state": state,
+        "subtype": subtype,
+        "price_range": price_range,
+        "total_zip_codes": len(results),
+        "zip_scores": results,
+        "degradation_level": DEGRADATION_LEVELS[level]
+    }
+    return content, level
+
+def profile_targets() -> dict:
+    """Functions on the prediction path that a profile breaks down"""
+    return {
+        "get_zip_codes_for_city": [get_zip_codes_for_city],
+        "dataframe_construction": [build_input_row, build_input_rows],
+        "predict_proba": [model.predict_proba],
+        "compute_shap": [compute_shap],
+        "map_feature_name": [map_feature_name],
+        "nearest_zip_search": [type(zip_index).nearest] if zip_index is not None else [],
+    }
+
+def requested_profile(request: Request) -> Optional[str]:
+    """
+    Whether to profile this request: 'requested' (valid token), 'sampled', or None
+    The token is only read from the X-Profile-Token header so it never lands in
+    URLs, the request log or proxy and browser caches
+    """
+    if not profile_gate.enabled:
+        return None
+    presented = request.headers.get("x-profile-token")
+    return profile_gate.decide(presented)
+
+def prediction_etag(*request_parts) -> Optional[str]:
+    """
+    ETag of a full (undegraded) prediction response
+    Depends only on the request, the model and context data versions and whether SHAP explanations are included
+    None while the explainer is unavailable, since no full response can be served then
+    """
+    if MODEL_VERSION is None or DATA_VERSION is None or explanations_unavailable():
+        return None
+    return make_etag(MODEL_VERSION, DATA_VERSION, shap_explainer is not None, *request_parts)
+
+def prediction_response(request: Request, content: dict, level: int, etag: Optional[str],
+                        profile_headers: Response) -> Response:
+    """Full responses are cacheable with an ETag; degraded and profiled ones are marked no-store"""
+    profiled = "x-profile-id" in profile_headers.headers
+    if level == FULL and not profiled:
+        response = cached_json(request, content, public_max_age(PREDICT_MAX_AGE), etag=etag)
+    else:
+        response = JSONResponse(content=content, headers={"Cache-Control": NO_STORE})
+    response.headers["X-Degradation-Level"] = DEGRADATION_LEVELS[level]
+    if profiled:
+        response.headers["X-Profile-Id"] = profile_headers.headers["x-profile-id"]
+    return response
+
 
 # main prediction endpoint - by city
 @app.post("/predict", response_model=OpportunityResponse)
-async def predict_by_city(request: CityOpportunityRequest):
+async def predict_by_city(request: CityOpportunityRequest, response: Response, http_request: Request):
     """
     Predict opportunity scores for all zip codes in a city
     
@@ -300,44 +777,210 @@ async def predict_by_city(request: CityOpportunityRequest):
     
     Returns:
     - List of opportunity scores for each zip code in the city
+    - degradation_level: how much of the response was skipped under load
+      (full, no_explanations, cached_only)
+    """
+    content, level = await run_city_prediction(
+        request.city, request.state, request.subtype, request.price_range,
+        response, requested_profile(http_request)
+    )
+    response.headers["X-Degradation-Level"] = DEGRADATION_LEVELS[level]
+    return content
+
+
+# cacheable prediction endpoint - same as POST /predict with query parameters
+@app.get("/predict", response_model=OpportunityResponse)
+async def predict_by_city_cached(
+    request: Request,
+    city: str = Query(..., example="Philadelphia"),
+    state: Optional[str] = Query(None, example="PA", description="Optional state code for disambiguation"),
+    subtype: str = Query(..., example="Italian"),
+    price_range: float = Query(..., ge=1.0, le=4.0, example=2.0)
+):
     """
+    Cacheable version of POST /predict
     
-    if model is None or df_final is None or zip_context_df is None:
-        raise HTTPException(status_code=503, detail="Model or data not loaded")
+    Full responses carry a strong ETag derived from the request and model version
+    and a public Cache-Control max-age; a matching If-None-Match returns 304
+    without scoring anything. Degraded responses are marked no-store.
+    """
+    etag = prediction_etag(city, state, subtype, float(price_range))
+    if etag is not None and etag_matches(request, etag):
+        return not_modified(etag, public_max_age(PREDICT_MAX_AGE))
     
-    zip_codes = get_zip_codes_for_city(request.city, request.state)
+    profile_headers = Response()
+    content, level = await run_city_prediction(
+        city, state, subtype, price_range, profile_headers, requested_profile(request)
+    )
+    return prediction_response(
+        request, content, level, prediction_etag(city, state, subtype, float(price_range)), profile_headers
+    )
+
+
+# prediction endpoint - nearest zip codes to a point
+@app.get("/predict/nearby", response_model=NearbyOpportunityResponse)
+async def predict_nearby(
+    request: Request,
+    lat: float = Query(..., ge=-90.0, le=90.0, example=39.9526),
+    lon: float = Query(..., ge=-180.0, le=180.0, example=-75.1652),
+    radius_miles: Optional[float] = Query(None, gt=0.0, le=100.0, example=5.0,
+                                          description="Only zip codes whose centroid is within this distance"),
+    k: Optional[int] = Query(None, ge=1, le=NEARBY_MAX_K,
+                             description=f"Maximum zip codes to score (default {NEARBY_DEFAULT_K}, "
+                                         f"or {NEARBY_MAX_K} with a radius)"),
+    subtype: str = Query(..., example="Italian"),
+    price_range: float = Query(..., ge=1.0, le=4.0, example=2.0)
+):
+    """
+    Predict opportunity scores for the zip codes nearest to a latitude/longitude
     
-    if not zip_codes:
-        raise HTTPException(
-            status_code=404,
-            detail=f"No zip codes found for city: {request.city}" + 
-                   (f", {request.state}" if request.state else "") +
-                   ". Try adding a state code or check /cities for available cities."
-        )
+    Zip codes come from a ball tree over zip centroids (see zip_index.py), so any
+    location can be scored, not just the predefined cities. Results are ordered
+    nearest first and carry the centroid distance in miles. Caching, load
+    shedding and profiling behave as in GET /predict.
+    """
+    if zip_index is None:
+        raise HTTPException(status_code=503, detail="ZIP index not loaded")
     
+    if k is None:
+        k = NEARBY_DEFAULT_K if radius_miles is None else NEARBY_MAX_K
+    
+    etag = prediction_etag("nearby", zip_index.version, lat, lon, radius_miles, k, subtype, float(price_range))
+    if etag is not None and etag_matches(request, etag):
+        return not_modified(etag, public_max_age(PREDICT_MAX_AGE))
+    
+    distances = {}
+    
+    def resolve_zip_codes():
+        zip_codes, miles = zip_index.nearest(lat, lon, k, radius_miles)
+        if len(zip_codes) == 0:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No zip codes within {radius_miles} miles of ({lat}, {lon})"
+            )
+        distances.update(zip(zip_codes.tolist(), miles.tolist()))
+        return list(distances)
+    
+    profile_headers = Response()
+    results, level = await run_prediction(
+        resolve_zip_codes, subtype, price_range, profile_headers, requested_profile(request),
+        {"lat": lat, "lon": lon, "radius_miles": radius_miles, "k": k, "subtype": subtype, "price_range": price_range}
+    )
+    
+    content = {
+        "latitude": lat,
+        "longitude": lon,
+        "radius_miles": radius_miles,
+        "k": k,
+        "subtype": subtype,
+        "price_range": price_range,
+        "total_zip_codes": len(results),
+        # cached results are shared, so copy rather than annotate in place
+        "zip_scores": [{**r, "distance_miles": round(distances[r["zip_code"]], 2)} for r in results],
+        "degradation_level": DEGRADATION_LEVELS[level]
+    }
+    etag = prediction_etag("nearby", zip_index.version, lat, lon, radius_miles, k, subtype, float(price_range))
+    return prediction_response(request, content, level, etag, profile_headers)
 
-    results = []
-    for zip_code in zip_codes:
-        prediction = predict_single_zip(zip_code, request.subtype, request.price_range)
-        if prediction:
-            results.append(prediction)
+
+# competitor profiles by city or zip list
+@app.post("/competition", response_model=CompetitionResponse)
+async def competition(request: CompetitionRequest):
+    """
+    Competitor statistics for every zip x subtype in a city or list of zip codes
     
-    if not results:
+    Parameters:
+    - city / state: City to look up, or
+    - zip_codes: Explicit list of zip codes (takes precedence over city)
+    - subtypes: Optional restaurant types to keep
+    - min_/max_ filters: Inclusive bounds on competitor_count, avg_stars,
+      subtype_market_share and rating_advantage
+    - sort_by / descending / limit: Ordering and size of the result
+    
+    Returns:
+    - List of competitor profiles
+    """
+    
+    if competition_store is None:
+        raise HTTPException(status_code=503, detail="Competition data not loaded")
+    
+    if request.sort_by not in competition_store.metrics:
         raise HTTPException(
-            status_code=500,
-            detail="Failed to generate predictions for any zip codes"
+            status_code=400,
+            detail=f"Cannot sort by '{request.sort_by}'. Choose one of: {', '.join(competition_store.metrics)}"
         )
     
+    if request.zip_codes:
+        rows = competition_store.rows_for_zips(request.zip_codes)
+    elif request.city:
+        # prefer the same metro zip lists used by /predict, then fall back to output.csv city names
+        zip_codes = get_zip_codes_for_city(request.city, request.state)
+        if zip_codes:
+            rows = competition_store.rows_for_zips(zip_codes)
+        else:
+            rows = competition_store.rows_for_city(request.city)
+        if len(rows) == 0:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No competition data found for city: {request.city}" +
+                       (f", {request.state}" if request.state else "")
+            )
+    else:
+        raise HTTPException(status_code=400, detail="Provide either a city or a list of zip_codes")
+    
+    filters = {
+        "competitor_count": (request.min_competitor_count, request.max_competitor_count),
+        "avg_stars": (request.min_avg_stars, request.max_avg_stars),
+        "subtype_market_share": (request.min_subtype_market_share, request.max_subtype_market_share),
+        "rating_advantage": (request.min_rating_advantage, request.max_rating_advantage),
+    }
+    filters = {col: bounds for col, bounds in filters.items() if bounds != (None, None)}
+    
+    competitors = competition_store.query(
+        rows,
+        subtypes=request.subtypes,
+        filters=filters,
+        sort_by=request.sort_by,
+        descending=request.descending,
+        limit=request.limit,
+    )
+    
     return {
         "city": request.city,
         "state": request.state,
-        "subtype": request.subtype,
-        "price_range": request.price_range,
-        "total_zip_codes": len(results),
-        "zip_scores": results
+        "total_results": len(competitors),
+        "competitors": competitors
     }
 
 
+# recent request profiles (operator only)
+@app.get("/profiles")
+async def list_profiles(request: Request):
+    """
+    Recent /predict profiles, newest first
+    Requires the PROFILE_TOKEN in the X-Profile-Token header
+    """
+    check_profile_token(request)
+    return {"profiles": list(reversed(profile_gate.recent))}
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request):
+    """A single /predict profile by the id returned in X-Profile-Id"""
+    check_profile_token(request)
+    for profile in profile_gate.recent:
+        if profile["id"] == profile_id:
+            return profile
+    raise HTTPException(status_code=404, detail=f"Profile not found: {profile_id}")
+
+def check_profile_token(request: Request):
+    """Reject profile reads unless profiling is configured and the operator token is presented"""
+    if profile_gate.token is None:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled")
+    presented = request.headers.get("x-profile-token")
+    if not profile_gate.authorized(presented):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
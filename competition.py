@@ -0,0 +1,156 @@
+"""
+Competition Store
+Columnar, pre-indexed view of output.csv (zip x subtype competitor statistics).
+Rows are grouped by ZIP and by city once at load time so queries only touch
+the rows they need instead of masking the whole table.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# numeric columns exposed in competitor profiles (everything except the keys)
+METRIC_COLUMNS = [
+    "competitor_count",
+    "avg_stars",
+    "avg_review_count",
+    "avg_price_range",
+    "pct_open",
+    "avg_review_rating",
+    "avg_business_age",
+    "total_restaurants",
+    "overall_avg_stars",
+    "overall_avg_reviews",
+    "restaurant_diversity",
+    "total_population",
+    "median_age",
+    "pct_white",
+    "pct_black",
+    "pct_asian",
+    "pct_hispanic",
+    "competition_density",
+    "subtype_market_share",
+    "rating_advantage",
+    "population_per_restaurant",
+]
+
+INTEGER_COLUMNS = {"competitor_count", "total_restaurants", "restaurant_diversity"}
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+class CompetitionStore:
+    """
+    Column arrays for output.csv plus three indexes:
+    - (zip_code, subtype) -> row
+    - zip_code -> rows (sorted by subtype)
+    - city (lowercase) -> rows
+    """
+
+    def __init__(self, zip_codes: np.ndarray, cities: np.ndarray, subtypes: np.ndarray,
+                 metrics: Dict[str, np.ndarray]):
+        self.zip_codes = zip_codes
+        self.cities = cities
+        self.subtypes = subtypes
+        self.metrics = metrics
+        self.subtype_names, self.subtype_codes = np.unique(subtypes.astype(str), return_inverse=True)
+
+        self.pair_index: Dict[Tuple[str, str], int] = {
+            (z, s): i for i, (z, s) in enumerate(zip(zip_codes, subtypes))
+        }
+        self.zip_index = self._group(zip_codes)
+        self.city_index = self._group(np.array([c.lower() for c in cities], dtype=object))
+
+    @classmethod
+    def from_csv(cls, path="output.csv") -> "CompetitionStore":
+        """Load output.csv into column arrays"""
+        import pandas as pd
+
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Competition data not found: {path}")
+        df = pd.read_csv(path, dtype={"zip_code": str}, float_precision="round_trip")
+        df = df.sort_values(["zip_code", "subtype"], kind="stable").reset_index(drop=True)
+        metrics = {
+            col: df[col].to_numpy(dtype=np.int32 if col in INTEGER_COLUMNS else np.float64)
+            for col in METRIC_COLUMNS
+        }
+        return cls(
+            df["zip_code"].to_numpy(dtype=object),
+            df["city"].to_numpy(dtype=object),
+            df["subtype"].to_numpy(dtype=object),
+            metrics,
+        )
+
+    @staticmethod
+    def _group(keys: np.ndarray) -> Dict[str, np.ndarray]:
+        """Map each distinct key to the (ascending) row numbers holding it"""
+        groups: Dict[str, list] = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(key, []).append(i)
+        return {k: np.asarray(v, dtype=np.int32) for k, v in groups.items()}
+
+    def __len__(self):
+        return len(self.zip_codes)
+
+    def rows_for_zips(self, zip_codes: List[str]) -> np.ndarray:
+        """Row numbers for a list of ZIP codes (unknown ZIPs are skipped)"""
+        parts = [self.zip_index.get(str(z).strip(), _EMPTY) for z in dict.fromkeys(zip_codes)]
+        return np.concatenate(parts) if parts else _EMPTY
+
+    def rows_for_city(self, city: str) -> np.ndarray:
+        """Row numbers for a city name as it appears in output.csv"""
+        return self.city_index.get(city.strip().lower(), _EMPTY)
+
+    def row(self, zip_code: str, subtype: str) -> Optional[dict]:
+        """Single competitor profile for a (zip, subtype) pair"""
+        i = self.pair_index.get((zip_code, subtype))
+        return None if i is None else self.profile(i)
+
+    def query(self, rows: np.ndarray, subtypes: Optional[List[str]] = None,
+              filters: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+              sort_by: Optional[str] = None, descending: bool = True,
+              limit: Optional[int] = None) -> List[dict]:
+        """
+        Filter and sort a candidate row set.
+        filters maps a metric column to an inclusive (min, max) range; either bound may be None.
+        """
+        if subtypes:
+            codes = np.flatnonzero(np.isin(self.subtype_names, subtypes))
+            rows = rows[np.isin(self.subtype_codes[rows], codes)]
+
+        for col, (lo, hi) in (filters or {}).items():
+            values = self.metrics[col][rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if lo is not None:
+                keep &= values >= lo
+            if hi is not None:
+                keep &= values <= hi
+            rows = rows[keep]
+
+        if sort_by is not None:
+            values = self.metrics[sort_by][rows].astype(np.float64)
+            # NaNs always sort last
+            values = np.where(np.isnan(values), -np.inf if descending else np.inf, values)
+            order = np.argsort(-values if descending else values, kind="stable")
+            rows = rows[order]
+
+        if limit is not None:
+            rows = rows[:limit]
+        return [self.profile(i) for i in rows]
+
+    def profile(self, i: int) -> dict:
+        """Convert one row into a JSON-ready dict"""
+        result = {
+            "zip_code": self.zip_codes[i],
+            "city": self.cities[i],
+            "subtype": self.subtypes[i],
+        }
+        for col in METRIC_COLUMNS:
+            value = self.metrics[col][i]
+            if col in INTEGER_COLUMNS:
+                result[col] = int(value)
+            else:
+                result[col] = None if np.isnan(value) else float(value)
+        return result
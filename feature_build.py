@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Feature Build
+Partitioned, parallel version of the feature engineering in
+model/data_preprocessing_and_model.ipynb. Produces restaurant_row_data.csv.
+
+The data is split by ZIP prefix (or state) so that every ZIP lives in exactly
+one partition; all zip-level and zip x subtype aggregates are then exact
+within a partition. Partitions are built in a process pool and each result is
+cached under a hash of its inputs, so re-running after a data change only
+rebuilds the partitions whose inputs changed.
+
+Usage:
+    python feature_build.py [--business ...] [--reviews ...] [--census ...]
+        [--output restaurant_row_data.csv] [--partition-by zip3|state]
+        [--workers N] [--cache-dir .feature_cache]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# bump when the partition logic changes so old cached partitions are not reused
+BUILD_VERSION = "1"
+
+DEFAULT_BUSINESS_FILE = "yelp_dataset/yelp_academic_dataset_business.json"
+DEFAULT_REVIEW_FILE = "yelp_dataset/yelp_academic_dataset_review.json"
+DEFAULT_CENSUS_FILE = "census_dataset/ACSDP5Y2023.DP05-Data.csv"
+
+RESTAURANT_KEYWORDS = ['restaurant', 'restaurants', 'food', 'pizza', 'burger', 'cafe', 'bar', 'grill', 'diner', 'bistro', 'eatery']
+
+# priority order matters: the first match wins
+CUISINE_TYPES = [
+    'italian', 'mexican', 'chinese', 'japanese', 'thai', 'indian', 'mediterranean',
+    'french', 'greek', 'korean', 'vietnamese', 'american', 'pizza',
+    'seafood', 'steakhouse', 'bbq', 'cafe', 'dessert',
+    'fast food', 'breakfast', 'brunch', 'diner'
+]
+
+CENSUS_FEATURES = {
+    'DP05_0001E': 'total_population',
+    'DP05_0018E': 'median_age',
+    'DP05_0037E': 'white_population',
+    'DP05_0038E': 'black_population',
+    'DP05_0047E': 'asian_population',
+    'DP05_0071E': 'hispanic_population',
+}
+
+CENSUS_COLS = [
+    'total_population', 'median_age', 'white_population', 'black_population',
+    'asian_population', 'hispanic_population', 'pct_white', 'pct_black',
+    'pct_asian', 'pct_hispanic'
+]
+
+ZIP_AGG_COLS = [
+    'zip_avg_star_rating', 'zip_median_review_count', 'zip_avg_price_range',
+    'zip_median_business_age', 'zip_total_restaurants'
+]
+
+# zip x subtype stats, in the column order the notebook's pivot produced
+LOCAL_STATS = ['avg_price', 'avg_stars', 'median_age', 'median_reviews', 'total_count']
+
+ENGINEERED_COLS = ['competition_density', 'market_share_of_competition', 'population_per_restaurant']
+
+TARGET_COL = 'five_year_survivor'
+
+# the only input columns build_partition reads; partitions are trimmed to these
+RESTAURANT_INPUT_COLS = ['business_id', 'zip_code', 'subtype', 'price_range', 'stars', 'review_count']
+REVIEW_INPUT_COLS = ['business_id', 'stars', 'date']
+
+
+# ---------------------------------------------------------------------------
+# Loading (vectorized versions of the notebook's per-row helpers)
+# ---------------------------------------------------------------------------
+
+def extract_subtypes(categories: pd.Series) -> pd.Series:
+    """
+    Primary subtype per business: the first category (in listed order) that
+    contains any cuisine keyword, taking the highest-priority keyword within it.
+    Same result as the notebook's extract_subtype, without a per-row apply.
+    """
+    exploded = categories.fillna('').str.split(',').explode().str.strip().str.lower()
+    match = np.full(len(exploded), -1)
+    # walk priorities from lowest to highest so the highest-priority match wins
+    for priority in range(len(CUISINE_TYPES) - 1, -1, -1):
+        hit = exploded.str.contains(CUISINE_TYPES[priority], regex=False).to_numpy()
+        match[hit] = priority
+
+    matched = pd.Series(match, index=exploded.index)
+    first = matched[matched >= 0].groupby(level=0).first()
+    names = np.array([c.title() for c in CUISINE_TYPES], dtype=object)
+    subtypes = pd.Series('General', index=categories.index, dtype=object)
+    subtypes.loc[first.index] = names[first.to_numpy()]
+    return subtypes
+
+
+def clean_postal_codes(postal_codes: pd.Series) -> pd.Series:
+    """5-digit zip code from a raw postal code, or None"""
+    digits = (postal_codes.astype(str).str.strip()
+              .str.split('-').str[0]
+              .str.replace(r'\D', '', regex=True))
+    digits = digits.where(postal_codes.notna() & (digits.str.len() >= 5))
+    return digits.str[:5]
+
+
+def load_restaurants(business_file) -> pd.DataFrame:
+    """Yelp businesses filtered to restaurants with subtype, price_range and zip_code"""
+    df = pd.read_json(business_file, lines=True, dtype={'postal_code': str})
+    df['categories'] = df['categories'].fillna('')
+    pattern = '|'.join(RESTAURANT_KEYWORDS)
+    df = df[df['categories'].str.lower().str.contains(pattern)].copy()
+
+    df['subtype'] = extract_subtypes(df['categories'])
+    df['price_range'] = pd.to_numeric(df['attributes'].str.get('RestaurantsPriceRange2'), errors='coerce')
+    df['zip_code'] = clean_postal_codes(df['postal_code'])
+    df = df[df['zip_code'].notna()].reset_index(drop=True)
+    print(f"[OK] Loaded {len(df)} restaurants with zip codes")
+    return df
+
+
+def load_reviews(review_file, business_ids, chunksize: int = 500_000) -> pd.DataFrame:
+    """Stars and dates of reviews for the given businesses, read in chunks"""
+    business_ids = pd.Index(business_ids)
+    chunks = []
+    with pd.read_json(review_file, lines=True, chunksize=chunksize) as reader:
+        for chunk in reader:
+            chunk = chunk.loc[chunk['business_id'].isin(business_ids), ['business_id', 'stars', 'date']]
+            chunks.append(chunk)
+    reviews = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=['business_id', 'stars', 'date'])
+    reviews['date'] = pd.to_datetime(reviews['date'])
+    print(f"[OK] Loaded {len(reviews)} restaurant reviews")
+    return reviews
+
+
+def load_demographics(census_file) -> pd.DataFrame:
+    """Census demographics per zip code, with the GEO_ID zip extracted by a vectorized regex"""
+    df = pd.read_csv(census_file, skiprows=[1], encoding='utf-8')
+    geo_ids = df['GEO_ID'].astype(str)
+    df['zip_code'] = geo_ids.str.split('Z200US').str[-1].where(df['GEO_ID'].notna() & geo_ids.str.contains('Z200US', regex=False))
+    df = df[df['zip_code'].notna()]
+
+    demographics = df[['zip_code'] + list(CENSUS_FEATURES)].rename(columns=CENSUS_FEATURES)
+    for col in CENSUS_FEATURES.values():
+        demographics[col] = pd.to_numeric(demographics[col], errors='coerce')
+
+    for group in ['white', 'black', 'asian', 'hispanic']:
+        demographics[f'pct_{group}'] = (demographics[f'{group}_population'] / demographics['total_population'] * 100).round(2)
+    pct_cols = ['pct_white', 'pct_black', 'pct_asian', 'pct_hispanic']
+    demographics[pct_cols] = demographics[pct_cols].replace([np.inf, -np.inf], 0).fillna(0)
+    print(f"[OK] Loaded demographics for {len(demographics)} zip codes")
+    return demographics.reset_index(drop=True)
+
+
+# ---------------------------------------------------------------------------
+# Partitioning
+# ---------------------------------------------------------------------------
+
+def partition_keys(restaurants: pd.DataFrame, partition_by: str) -> pd.Series:
+    """Partition key per zip code; every zip maps to exactly one partition"""
+    zips = restaurants[['zip_code', 'state']].copy()
+    if partition_by == 'state':
+        # a zip listed under several states goes to its most common one
+        return zips.groupby('zip_code')['state'].agg(lambda s: s.mode().iat[0]).rename('partition')
+    if partition_by.startswith('zip'):
+        digits = int(partition_by[3:] or 3)
+        unique_zips = pd.Series(zips['zip_code'].unique())
+        return pd.Series(unique_zips.str[:digits].to_numpy(), index=unique_zips.to_numpy(), name='partition')
+    raise ValueError(f"Unknown partition scheme: {partition_by} (use 'state' or 'zipN', e.g. 'zip3')")
+
+
+def split_partitions(restaurants, reviews, demographics, zip_partition: pd.Series) -> dict:
+    """Split the three inputs into {partition: (restaurants, reviews, demographics)}"""
+    restaurant_part = restaurants['zip_code'].map(zip_partition)
+    business_part = pd.Series(restaurant_part.to_numpy(), index=restaurants['business_id'])
+    review_part = reviews['business_id'].map(business_part)
+    census_part = demographics['zip_code'].map(zip_partition)
+
+    review_groups = reviews.groupby(review_part, sort=False).indices
+    census_groups = demographics.groupby(census_part, sort=False).indices
+
+    restaurant_inputs = restaurants[RESTAURANT_INPUT_COLS]
+    review_inputs = reviews[REVIEW_INPUT_COLS]
+    partitions = {}
+    for key, rows in restaurants.groupby(restaurant_part, sort=True).indices.items():
+        partitions[key] = (
+            restaurant_inputs.iloc[rows].reset_index(drop=True),
+            review_inputs.iloc[review_groups.get(key, [])].reset_index(drop=True),
+            demographics.iloc[census_groups.get(key, [])].reset_index(drop=True),
+        )
+    return partitions
+
+
+def partition_hash(restaurants, reviews, demographics) -> str:
+    """Content hash of a partition's inputs"""
+    digest = hashlib.sha256(BUILD_VERSION.encode())
+    for df in (restaurants, reviews, demographics):
+        digest.update(json.dumps(list(map(str, df.columns))).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Per-partition feature engineering
+# ---------------------------------------------------------------------------
+
+def build_partition(restaurants: pd.DataFrame, reviews: pd.DataFrame, demographics: pd.DataFrame) -> pd.DataFrame:
+    """
+    Notebook feature engineering for one partition. Stops before price_range
+    imputation, which needs the global median, and the census row filter,
+    which the notebook applies after it.
+    """
+    df = restaurants
+
+    # review metrics per business
+    review_agg = reviews.groupby('business_id').agg(
+        avg_review_rating=('stars', 'mean'),
+        std_review_rating=('stars', 'std'),
+        total_reviews=('stars', 'count'),
+        first_review_date=('date', 'min'),
+        last_review_date=('date', 'max'),
+    ).reset_index()
+    review_agg['business_age_years'] = (review_agg['last_review_date'] - review_agg['first_review_date']).dt.days / 365.25
+    df = df.merge(review_agg, on='business_id', how='left')
+
+    # zip level aggregates
+    zip_agg = df.groupby('zip_code').agg(
+        zip_avg_star_rating=('stars', 'mean'),
+        zip_median_review_count=('review_count', 'median'),
+        zip_avg_price_range=('price_range', 'mean'),
+        zip_median_business_age=('business_age_years', 'median'),
+        zip_total_restaurants=('business_id', 'count'),
+    ).reset_index()
+    df = df.merge(zip_agg, on='zip_code', how='left')
+
+    # zip x subtype local competition, one wide column per subtype and stat
+    local_agg = df.groupby(['zip_code', 'subtype']).agg(
+        avg_stars=('stars', 'mean'),
+        total_count=('business_id', 'count'),
+        avg_price=('price_range', 'mean'),
+        median_reviews=('review_count', 'median'),
+        median_age=('business_age_years', 'median'),
+    )
+    local_wide = local_agg.unstack('subtype')
+    local_wide.columns = [f"{subtype}_{stat}_zip" for stat, subtype in local_wide.columns]
+    # pivot_table drops all-NaN columns; keep that behaviour
+    local_wide = local_wide.dropna(axis=1, how='all').fillna(0)
+    df = df.merge(local_wide, left_on='zip_code', right_index=True, how='left')
+    competition_cols = list(local_wide.columns)
+    df[competition_cols] = df[competition_cols].fillna(0)
+
+    # census demographics
+    df = df.merge(demographics, on='zip_code', how='left')
+
+    # engineered features: count of the row's own subtype in its zip, looked up without a per-row apply
+    count_cols = [c for c in competition_cols if c.endswith('_total_count_zip')]
+    count_subtypes = [c[:-len('_total_count_zip')] for c in count_cols]
+    own_count = np.zeros(len(df))
+    if count_cols:
+        position = pd.Index(count_subtypes).get_indexer(df['subtype'])
+        counts = df[count_cols].to_numpy(dtype=float)
+        has = position >= 0
+        own_count[has] = counts[np.flatnonzero(has), position[has]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['competition_density'] = own_count / df['total_population']
+        df['market_share_of_competition'] = own_count / df['zip_total_restaurants']
+        df['population_per_restaurant'] = df['total_population'] / df['zip_total_restaurants']
+    for col in ENGINEERED_COLS:
+        df[col] = df[col].replace([np.inf, -np.inf], 0).fillna(0)
+
+    # target: survived more than 5 years (missing age counts as not surviving)
+    df[TARGET_COL] = (df['business_age_years'] > 5).astype(int)
+
+    # keep only what is known at inference time
+    # business_id is kept only so the merge can restore the input row order
+    return df[['business_id', 'subtype', 'price_range', 'zip_code'] + ZIP_AGG_COLS + competition_cols +
+              CENSUS_COLS + ENGINEERED_COLS + [TARGET_COL]]
+
+
+def _build_and_cache(inputs, cache_path: Path) -> pd.DataFrame:
+    """Worker entry point: build one partition and write it to the cache"""
+    result = build_partition(*inputs)
+    tmp_path = cache_path.with_suffix('.tmp')
+    result.to_pickle(tmp_path)
+    os.replace(tmp_path, cache_path)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Orchestration
+# ---------------------------------------------------------------------------
+
+def competition_column_order(columns) -> list:
+    """Order zip x subtype columns by stat, then subtype (the notebook's pivot order)"""
+    def sort_key(col):
+        for i, stat in enumerate(LOCAL_STATS):
+            suffix = f"_{stat}_zip"
+            if col.endswith(suffix):
+                return (i, col[:-len(suffix)])
+        return (len(LOCAL_STATS), col)
+    return sorted(columns, key=sort_key)
+
+
+def merge_partitions(parts: list, business_order: pd.Series) -> pd.DataFrame:
+    """Concatenate partition outputs in the original restaurant order and apply the global steps"""
+    df = pd.concat(parts, ignore_index=True)
+    df = df.iloc[np.argsort(pd.Index(business_order).get_indexer(df['business_id']), kind='stable')]
+
+    # partitions only have columns for subtypes they contain
+    fixed = set(['business_id', 'subtype', 'price_range', 'zip_code', TARGET_COL] + ZIP_AGG_COLS + CENSUS_COLS + ENGINEERED_COLS)
+    competition_cols = competition_column_order([c for c in df.columns if c not in fixed])
+    df[competition_cols] = df[competition_cols].fillna(0)
+
+    # price_range imputation uses the median over all partitions
+    missing = df['price_range'].isna().sum()
+    if missing > 0:
+        median_price = df['price_range'].median()
+        df['price_range'] = df['price_range'].fillna(median_price)
+        print(f"Imputed {missing:,} missing 'price_range' values with median ({median_price}).")
+
+    # rows without census data cannot be scored
+    rows_before = len(df)
+    df = df.dropna(subset=CENSUS_COLS)
+    print(f"Dropped {rows_before - len(df):,} rows with missing census data.")
+
+    ordered = (['subtype', 'price_range', 'zip_code'] + ZIP_AGG_COLS + competition_cols +
+               CENSUS_COLS + ENGINEERED_COLS + [TARGET_COL])
+    return df[ordered].reset_index(drop=True)
+
+
+def build_features(restaurants, reviews, demographics, partition_by='zip3', workers=None,
+                   cache_dir='.feature_cache') -> pd.DataFrame:
+    """Build the modeling table, reusing cached partitions whose inputs are unchanged"""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    zip_partition = partition_keys(restaurants, partition_by)
+    partitions = split_partitions(restaurants, reviews, demographics, zip_partition)
+    print(f"[OK] Split into {len(partitions)} partitions by {partition_by}")
+
+    results = {}
+    to_build = {}
+    for key, inputs in partitions.items():
+        cache_path = cache_dir / f"{partition_by}-{key}-{partition_hash(*inputs)[:16]}.pkl"
+        if cache_path.exists():
+            results[key] = pd.read_pickle(cache_path)
+        else:
+            to_build[key] = (inputs, cache_path)
+    print(f"[OK] {len(results)} partitions cached, {len(to_build)} to build")
+
+    if to_build:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                key: pool.submit(_build_and_cache, inputs, cache_path)
+                for key, (inputs, cache_path) in to_build.items()
+            }
+            for key, future in futures.items():
+                results[key] = future.result()
+
+        # drop superseded cache entries for the partitions just rebuilt
+        for key, (_, cache_path) in to_build.items():
+            for stale in cache_dir.glob(f"{partition_by}-{key}-*.pkl"):
+                if stale != cache_path:
+                    stale.unlink()
+
+    return merge_partitions([results[key] for key in sorted(results)], restaurants['business_id'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build restaurant_row_data.csv from Yelp and Census data")
+    parser.add_argument("--business", default=DEFAULT_BUSINESS_FILE, help="Yelp business JSON lines file")
+    parser.add_argument("--reviews", default=DEFAULT_REVIEW_FILE, help="Yelp review JSON lines file")
+    parser.add_argument("--census", default=DEFAULT_CENSUS_FILE, help="ACS DP05 census CSV")
+    parser.add_argument("--output", default="restaurant_row_data.csv", help="Output CSV path")
+    parser.add_argument("--partition-by", default="zip3",
+                        help="'state' or 'zipN' to partition by the first N zip digits (default zip3)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--cache-dir", default=".feature_cache", help="Directory for cached partitions")
+    args = parser.parse_args()
+
+    for path in (args.business, args.reviews, args.census):
+        if not Path(path).exists():
+            print(f"[ERROR] Input not found: {path}")
+            return 1
+
+    t0 = time.perf_counter()
+    restaurants = load_restaurants(args.business)
+    reviews = load_reviews(args.reviews, restaurants['business_id'])
+    demographics = load_demographics(args.census)
+
+    df_final = build_features(restaurants, reviews, demographics, args.partition_by, args.workers, args.cache_dir)
+    df_final.to_csv(args.output, index=False)
+    print(f"[OK] Wrote {df_final.shape[0]} rows and {df_final.shape[1]} columns to {args.output} "
+          f"in {time.perf_counter() - t0:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -114,20 +114,17 @@ async function handleAnalyze() {
     }
 }
 
-//post request - gets actual scores from API
+//get request - gets actual scores from API (cacheable, revalidated with ETags)
 async function fetchOpportunityScores(city, state, subtype, priceRange) {
-    const response = await fetch(`${API_BASE_URL}/predict`, {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-            city: city,
-            state: state,
-            subtype: subtype,
-            price_range: priceRange
-        })
+    const params = new URLSearchParams({
+        city: city,
+        subtype: subtype,
+        price_range: priceRange
     });
+    if (state) {
+        params.append('state', state);
+    }
+    const response = await fetch(`${API_BASE_URL}/predict?${params}`);
     
     if (!response.ok) {
         const error = await response.json();
@@ -0,0 +1,93 @@
+"""
+HTTP Caching Helpers
+ETags, Cache-Control and If-None-Match handling for the API's
+deterministic GET endpoints.
+"""
+
+import hashlib
+import json
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from starlette.datastructures import MutableHeaders
+
+# Cache-Control policies
+NO_STORE = "no-store"
+REVALIDATE = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from any JSON-serializable parts (e.g. model version + request parameters)"""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def public_max_age(seconds: int) -> str:
+    return f"public, max-age={seconds}"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the client's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def cached_json(request: Request, content, cache_control: str, etag: str = None) -> Response:
+    """
+    JSON response carrying an ETag and Cache-Control, or a 304 if the client already has it.
+    Without an explicit etag, one is derived from the serialized body.
+    """
+    body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode("utf-8")
+    if etag is None:
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
+
+
+class WeakenEncodedETagMiddleware:
+    """
+    ETags are computed before compression, so the br, gzip and identity
+    versions of a response would share one strong ETag, which strong
+    validators may not do. Marks the ETag weak on compressed responses, and
+    on 304s that revalidate a weak (compressed) copy.
+    Add it after the compression middleware so it wraps it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = [
+            value.decode("latin-1").strip()
+            for name, raw in scope["headers"] if name == b"if-none-match"
+            for value in raw.split(b",")
+        ]
+
+        async def send_weakened(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    compressed = "content-encoding" in headers
+                    revalidated_weak = message["status"] == 304 and f"W/{etag}" in if_none_match
+                    if compressed or revalidated_weak:
+                        headers["etag"] = f"W/{etag}"
+            await send(message)
+
+        await self.app(scope, receive, send_weakened)
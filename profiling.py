@@ -0,0 +1,218 @@
+"""
+Request Profiling
+On-demand profiling of individual /predict calls. Nothing here runs unless a
+request is explicitly flagged by an operator or picked by sampling, so
+unprofiled requests pay no instrumentation cost.
+
+A profile breaks down wall time (cProfile) and memory allocations
+(tracemalloc) across a fixed set of named functions on the prediction path.
+Timings include the profiler's own overhead, so compare them with each other
+rather than with unprofiled latency.
+"""
+
+import cProfile
+import hmac
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+def _code(func: Callable):
+    """Code object of a function, bound method or decorated callable"""
+    func = getattr(func, "__func__", func)
+    while hasattr(func, "__wrapped__"):
+        func = func.__wrapped__
+    return func.__code__
+
+
+def _key(code) -> tuple:
+    """pstats key for a code object"""
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+class RequestProfiler:
+    """
+    Profiles one request. Work can be spread over several threads (e.g. the
+    event loop and a threadpool worker); wrap each piece with run().
+    Time comes from cProfile; memory from tracemalloc readings taken as each
+    target function is entered and left. Only one profile runs at a time
+    because tracemalloc is process-wide.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, targets: Dict[str, List[Callable]], reason: str):
+        self.labels = list(targets)
+        self.codes = {_code(f): label for label, funcs in targets.items() for f in funcs}
+        self.reason = reason
+        self.id = uuid.uuid4().hex[:12]
+        self.memory = {label: {"peak": 0, "net": 0} for label in self.labels}
+        self._profiles = []
+        self._stack = threading.local()
+        self._started_tracemalloc = False
+        self._t0 = None
+        # _trace_call resets the tracemalloc peak, so the request-wide peak is kept here
+        self._peak = 0
+
+    @classmethod
+    def try_start(cls, targets: Dict[str, List[Callable]], reason: str) -> Optional["RequestProfiler"]:
+        """Start a profile, or return None if another one is already running"""
+        if not cls._lock.acquire(blocking=False):
+            return None
+        profiler = cls(targets, reason)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            profiler._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        profiler._t0 = time.perf_counter()
+        return profiler
+
+    def run(self, func: Callable, *args, **kwargs):
+        """Call func under cProfile and the memory tracer in the current thread"""
+        self._stack.frames = []
+        profile = cProfile.Profile()
+        sys.settrace(self._trace_call)
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            sys.settrace(None)
+            self._profiles.append(profile)
+
+    def _trace_call(self, frame, event, arg):
+        # global trace hook: only target functions get a local tracer
+        label = self.codes.get(frame.f_code)
+        if label is None:
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        frames = self._stack.frames
+        if frames:
+            frames[-1][2] = max(frames[-1][2], peak)
+        self._peak = max(self._peak, peak)
+        tracemalloc.reset_peak()
+        frames.append([label, current, current])
+        return self._trace_return
+
+    def _trace_return(self, frame, event, arg):
+        if event == "return":
+            current, peak = tracemalloc.get_traced_memory()
+            label, entry, running_peak = self._stack.frames.pop()
+            call_peak = max(running_peak, peak)
+            stats = self.memory[label]
+            stats["peak"] = max(stats["peak"], call_peak - entry)
+            stats["net"] += current - entry
+            if self._stack.frames:
+                self._stack.frames[-1][2] = max(self._stack.frames[-1][2], call_peak)
+        return self._trace_return
+
+    def finish(self) -> dict:
+        """Stop profiling and build the breakdown"""
+        try:
+            wall_ms = (time.perf_counter() - self._t0) * 1000
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(self._peak, peak)
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        finally:
+            RequestProfiler._lock.release()
+
+        stats = pstats.Stats(self._profiles[0])
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+
+        return {
+            "id": self.id,
+            "reason": self.reason,
+            "timestamp": time.time(),
+            "wall_ms": round(wall_ms, 3),
+            "peak_traced_kb": round(peak / 1024, 1),
+            "breakdown": self._breakdown(stats.stats),
+            "top_functions": self._top_functions(stats.stats),
+        }
+
+    def _breakdown(self, raw_stats) -> Dict[str, dict]:
+        """
+        Calls, cumulative time and memory for each named target.
+        Targets can nest (map_feature_name runs inside compute_shap), so rows overlap.
+        peak_alloc_kb is the largest growth in traced memory during one call;
+        net_alloc_kb is what all calls left allocated.
+        """
+        by_label = {label: [0, 0.0] for label in self.labels}
+        for code, label in self.codes.items():
+            if _key(code) in raw_stats:
+                _, nc, _, ct, _ = raw_stats[_key(code)]
+                by_label[label][0] += nc
+                by_label[label][1] += ct
+
+        return {
+            label: {
+                "calls": calls,
+                "time_ms": round(cumulative * 1000, 3),
+                "peak_alloc_kb": round(self.memory[label]["peak"] / 1024, 1),
+                "net_alloc_kb": round(self.memory[label]["net"] / 1024, 1),
+            }
+            for label, (calls, cumulative) in by_label.items()
+        }
+
+    @staticmethod
+    def _top_functions(raw_stats, limit: int = 15) -> List[dict]:
+        """Functions with the most self time, for drilling below the named targets"""
+        rows = sorted(raw_stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [
+            {
+                "function": f"{os.path.basename(filename)}:{lineno}({name})",
+                "calls": nc,
+                "self_ms": round(tt * 1000, 3),
+                "cumulative_ms": round(ct * 1000, 3),
+            }
+            for (filename, lineno, name), (_, nc, tt, ct, _) in rows
+        ]
+
+
+class ProfileGate:
+    """
+    Decides which requests get profiled and keeps recent profiles.
+    PROFILE_TOKEN enables operator-requested profiles (the caller must present the token);
+    PROFILE_SAMPLE_RATE profiles that fraction of all requests. Both are off by default.
+    """
+
+    def __init__(self, token: Optional[str] = None, sample_rate: float = 0.0, keep: int = 50):
+        self.token = token
+        self.sample_rate = sample_rate
+        self.recent = deque(maxlen=keep)
+
+    @classmethod
+    def from_env(cls) -> "ProfileGate":
+        return cls(
+            token=os.getenv("PROFILE_TOKEN") or None,
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", 0.0)),
+            keep=int(os.getenv("PROFILE_KEEP", 50)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None or self.sample_rate > 0
+
+    def authorized(self, presented: Optional[str]) -> bool:
+        # compare_digest only accepts ASCII str, so compare bytes to survive any header value
+        return (self.token is not None and presented is not None
+                and hmac.compare_digest(presented.encode("utf-8"), self.token.encode("utf-8")))
+
+    def decide(self, presented: Optional[str]) -> Optional[str]:
+        """'requested', 'sampled' or None for a request presenting the given token"""
+        if self.authorized(presented):
+            return "requested"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def store(self, profile: dict):
+        self.recent.append(profile)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Traffic Replay Tool
+Replays a JSONL request log (written by the API with REQUEST_LOG_PATH set)
+through the in-process app and reports throughput and latency percentiles
+per endpoint.
+
+Usage:
+    python replay.py logs/requests.jsonl [logs/requests.jsonl.1 ...]
+        [--speed 1.0] [--concurrency 8] [--limit N]
+"""
+
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from request_log import read_log
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def send_record(client, record):
+    """Send one logged request and return (endpoint, status, latency_ms)"""
+    url = record["path"]
+    if record.get("query"):
+        url = f"{url}?{record['query']}"
+    body = record.get("body")
+    kwargs = {}
+    if isinstance(body, (dict, list)):
+        kwargs["json"] = body
+    elif body is not None:
+        kwargs["content"] = body
+
+    t0 = time.perf_counter()
+    try:
+        status = client.request(record["method"], url, **kwargs).status_code
+    except Exception as e:
+        print(f"   [ERROR] {record['method']} {url}: {e}")
+        status = 0
+    return f"{record['method']} {record['path']}", status, (time.perf_counter() - t0) * 1000
+
+
+def wait_until_ready(client, timeout=300.0):
+    """
+    Block until every startup stage has finished, not just the ones /health/ready
+    needs, so replayed traffic takes the same code path as production (SHAP,
+    fast path, competition store). Returns whether predictions can be served.
+    """
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        health = client.get("/").json()
+        if not any(state in ("pending", "loading") for state in health["stages"].values()):
+            failed = [name for name, state in health["stages"].items() if state == "failed"]
+            if failed:
+                print(f"[WARNING] Startup stages failed, replay will not match production: {', '.join(failed)}")
+            return health["ready"]
+        time.sleep(0.1)
+    return False
+
+
+def replay(records, speed=1.0, concurrency=8):
+    """
+    Replay records against the in-process app.
+    speed scales the original inter-arrival times (2.0 = twice as fast);
+    speed <= 0 sends everything as fast as the worker pool allows.
+    """
+    # replaying must not append to the log being replayed
+    os.environ.pop("REQUEST_LOG_PATH", None)
+    from fastapi.testclient import TestClient
+    from api import app
+
+    results = []
+    lock = threading.Lock()
+
+    def worker(record):
+        result = send_record(client, record)
+        with lock:
+            results.append(result)
+
+    with TestClient(app) as client:
+        if not wait_until_ready(client):
+            raise RuntimeError("API did not become ready; check the startup stage warnings above")
+        t0_log = records[0].get("ts", 0) if records else 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for record in records:
+                if speed > 0:
+                    delay = (record.get("ts", t0_log) - t0_log) / speed - (time.perf_counter() - start)
+                    if delay > 0:
+                        time.sleep(delay)
+                pool.submit(worker, record)
+        elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+def summarize(results, elapsed):
+    """Group replay results by endpoint into throughput and latency stats"""
+    by_endpoint = defaultdict(list)
+    for endpoint, status, latency in results:
+        by_endpoint[endpoint].append((status, latency))
+    by_endpoint["ALL"] = [(s, l) for _, s, l in results]
+
+    summary = {}
+    for endpoint, rows in by_endpoint.items():
+        latencies = sorted(l for _, l in rows)
+        summary[endpoint] = {
+            "count": len(rows),
+            "errors": sum(1 for s, _ in rows if s == 0 or s >= 500),
+            "throughput_rps": len(rows) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p90_ms": percentile(latencies, 90),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": latencies[-1] if latencies else 0.0,
+        }
+    return summary
+
+
+def print_summary(summary, elapsed):
+    print(f"\nReplayed {summary.get('ALL', {}).get('count', 0)} requests in {elapsed:.2f}s\n")
+    header = f"{'endpoint':<30} {'count':>7} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for endpoint in sorted(summary, key=lambda e: (e == "ALL", e)):
+        s = summary[endpoint]
+        print(f"{endpoint:<30} {s['count']:>7} {s['errors']:>7} {s['throughput_rps']:>9.1f} "
+              f"{s['p50_ms']:>9.1f} {s['p90_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a Chef's Kiss API request log")
+    parser.add_argument("logs", nargs="+", help="JSONL request log file(s)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Rate multiplier over the original traffic (0 = as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum in-flight requests")
+    parser.add_argument("--limit", type=int, default=None, help="Only replay the first N requests")
+    args = parser.parse_args()
+
+    records = read_log(args.logs)
+    if args.limit is not None:
+        records = records[:args.limit]
+    if not records:
+        print("[ERROR] No requests found in log")
+        return 1
+
+    print(f"Replaying {len(records)} requests (speed={args.speed}, concurrency={args.concurrency})...")
+    results, elapsed = replay(records, speed=args.speed, concurrency=args.concurrency)
+    print_summary(summarize(results, elapsed), elapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
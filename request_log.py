@@ -0,0 +1,198 @@
+"""
+Request Log
+Buffered, non-blocking JSONL request logging for the Chef's Kiss API.
+Each request is appended as one JSON line (body, endpoint, status, latency,
+model version) to a size-rotated log file that replay.py can read back.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_QUEUE_SIZE = 10000
+
+
+class RequestLogger:
+    """
+    Appends request records to a rotating JSONL file from a background thread.
+    log() never blocks the caller: records go into a bounded queue and are
+    dropped (and counted) if the writer falls behind.
+    """
+
+    def __init__(self, path, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backup_count: int = DEFAULT_BACKUP_COUNT,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestLogger"]:
+        """Build a logger from REQUEST_LOG_* environment variables, or None if logging is off"""
+        path = os.getenv("REQUEST_LOG_PATH")
+        if not path:
+            return None
+        return cls(
+            path,
+            max_bytes=int(os.getenv("REQUEST_LOG_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            backup_count=int(os.getenv("REQUEST_LOG_BACKUPS", DEFAULT_BACKUP_COUNT)),
+        )
+
+    def start(self):
+        """Open the log file and start the writer thread"""
+        if self._thread is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, record: dict):
+        """Queue a record for writing without blocking"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Stop the writer thread after draining everything already queued"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+        self._file = None
+        if self.dropped:
+            print(f"[WARNING] Request log dropped {self.dropped} records (writer fell behind); replays will be lighter than the real traffic")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._write_batch([record] + self._drain())
+        # final drain on shutdown
+        remaining = self._drain()
+        if remaining:
+            self._write_batch(remaining)
+
+    def _drain(self) -> list:
+        records = []
+        while True:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                return records
+
+    def _write_batch(self, records: list):
+        try:
+            data = "".join(json.dumps(r, default=str) + "\n" for r in records)
+            if self._file.tell() + len(data) > self.max_bytes and self._file.tell() > 0:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+        except Exception as e:
+            print(f"[WARNING] Request log write failed: {e}")
+
+    def _rotate(self):
+        """Shift requests.jsonl -> requests.jsonl.1 -> ... keeping backup_count files"""
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = self.path.with_name(f"{self.path.name}.{i}")
+                if src.exists():
+                    src.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+            self._file = open(self.path, "a", encoding="utf-8")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+
+
+class RequestLogMiddleware:
+    """
+    ASGI middleware that records every HTTP request to a RequestLogger.
+    Implemented at the ASGI level so the request body can be captured
+    without consuming it before the endpoint reads it.
+    """
+
+    def __init__(self, app, logger: RequestLogger, model_version: Callable[[], Optional[str]]):
+        self.app = app
+        self.logger = logger
+        self.model_version = model_version
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        body_chunks = []
+        status = {"code": 500}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                body_chunks.append(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.time()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            latency_ms = (time.perf_counter() - t0) * 1000
+            self.logger.log({
+                "ts": started,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "body": _decode_body(b"".join(body_chunks)),
+                "status": status["code"],
+                "latency_ms": round(latency_ms, 3),
+                "model_version": self.model_version(),
+            })
+
+
+def _decode_body(raw: bytes):
+    """Store JSON bodies as objects so the log stays readable; fall back to text"""
+    if not raw:
+        return None
+    text = raw.decode("utf-8", errors="replace")
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def read_log(paths) -> list:
+    """Read request records from one or more JSONL logs, ordered by timestamp"""
+    records = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    records.sort(key=lambda r: r.get("ts", 0))
+    return records
@@ -5,7 +5,12 @@ This script tests the API endpoints that the frontend uses
 
 import requests
 import json
+import os
+import subprocess
 import sys
+import tempfile
+import time
+from pathlib import Path
 
 API_BASE_URL = "http://localhost:8000"
 
@@ -23,7 +28,7 @@ def test_health_check():
             print(f"   [OK] Available subtypes: {len(data['available_subtypes'])}")
             return True
         else:
-                print(f"   [ERROR] Status code {response.status_code}")
+            print(f"   [ERROR] Status code {response.status_code}")
             return False
     except requests.exceptions.ConnectionError:
         print(f"   [ERROR] Could not connect to API at {API_BASE_URL}")
@@ -158,6 +163,738 @@ def test_invalid_requests():
     except Exception as e:
         print(f"   [ERROR] {e}")
 
+def test_competition_endpoint():
+    """Test the competition endpoint for a city and a zip list"""
+    print("\n4. Testing Competition Endpoint...")
+    
+    all_passed = True
+    try:
+        response = requests.post(
+            f"{API_BASE_URL}/competition",
+            json={
+                "city": "Philadelphia",
+                "state": "PA",
+                "subtypes": ["Italian"],
+                "sort_by": "competitor_count",
+                "limit": 5
+            },
+            timeout=10
+        )
+        if response.status_code == 200:
+            data = response.json()
+            counts = [c['competitor_count'] for c in data['competitors']]
+            print(f"   [OK] {data['total_results']} Italian competitor profiles in Philadelphia")
+            if counts != sorted(counts, reverse=True):
+                print(f"   [ERROR] Results not sorted by competitor_count: {counts}")
+                all_passed = False
+            if any(c['subtype'] != "Italian" for c in data['competitors']):
+                print(f"   [ERROR] Subtype filter not applied")
+                all_passed = False
+        else:
+            print(f"   [ERROR] Status code {response.status_code}")
+            all_passed = False
+        
+        response = requests.post(
+            f"{API_BASE_URL}/competition",
+            json={"zip_codes": ["19103", "19104"]},
+            timeout=10
+        )
+        if response.status_code == 200:
+            zips = {c['zip_code'] for c in response.json()['competitors']}
+            print(f"   [OK] ZIP list query returned ZIPs: {sorted(zips)}")
+            if not zips <= {"19103", "19104"}:
+                print(f"   [ERROR] Unexpected ZIPs in result")
+                all_passed = False
+        else:
+            print(f"   [ERROR] Status code {response.status_code}")
+            all_passed = False
+    except Exception as e:
+        print(f"   [ERROR] {e}")
+        all_passed = False
+    
+    return all_passed
+
+def test_http_caching():
+    """Test ETag / If-None-Match handling on GET /predict"""
+    print("\n5. Testing HTTP Caching...")
+    
+    params = {"city": "Philadelphia", "state": "PA", "subtype": "Italian", "price_range": 2.0}
+    try:
+        response = requests.get(f"{API_BASE_URL}/predict", params=params, timeout=30)
+        if response.status_code != 200:
+            print(f"   [ERROR] Status code {response.status_code}")
+            return False
+        etag = response.headers.get("ETag")
+        print(f"   [OK] ETag: {etag}")
+        print(f"   [OK] Cache-Control: {response.headers.get('Cache-Control')}")
+        if not etag:
+            print(f"   [WARNING] No ETag (response was degraded: {response.headers.get('X-Degradation-Level')})")
+            return False
+        
+        response = requests.get(
+            f"{API_BASE_URL}/predict",
+            params=params,
+            headers={"If-None-Match": etag},
+            timeout=30
+        )
+        if response.status_code == 304:
+            print(f"   [OK] Conditional request returned 304 Not Modified")
+            return True
+        print(f"   [ERROR] Expected 304, got {response.status_code}")
+        return False
+    except Exception as e:
+        print(f"   [ERROR] {e}")
+        return False
+
+def test_nearby_endpoint():
+    """Test nearest-ZIP scoring by coordinates"""
+    print("\n6. Testing Nearby Endpoint...")
+    
+    params = {"lat": 39.9526, "lon": -75.1652, "radius_miles": 5, "subtype": "Italian", "price_range": 2.0}
+    try:
+        response = requests.get(f"{API_BASE_URL}/predict/nearby", params=params, timeout=30)
+        if response.status_code == 503:
+            print(f"   [WARNING] ZIP index not loaded (build it with: python zip_index.py)")
+            return False
+        if response.status_code != 200:
+            print(f"   [ERROR] Status code {response.status_code}")
+            return False
+        data = response.json()
+        distances = [s['distance_miles'] for s in data['zip_scores']]
+        print(f"   [OK] {data['total_zip_codes']} ZIPs within {params['radius_miles']} miles of downtown Philadelphia")
+        if distances != sorted(distances) or any(d > params['radius_miles'] for d in distances):
+            print(f"   [ERROR] Results not nearest-first within the radius: {distances}")
+            return False
+        return True
+    except Exception as e:
+        print(f"   [ERROR] {e}")
+        return False
+
+STARTUP_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import api
+import_s = time.perf_counter() - t0
+heavy_at_import = [m for m in ('pandas', 'joblib', 'shap') if m in sys.modules]
+
+from fastapi.testclient import TestClient
+t0 = time.perf_counter()
+with TestClient(api.app) as client:
+    accept_s = time.perf_counter() - t0
+    live = client.get('/health/live').status_code
+    ready_s = None
+    while time.perf_counter() - t0 < 120:
+        response = client.get('/health/ready')
+        if response.status_code == 200:
+            ready_s = time.perf_counter() - t0
+            break
+        if 'failed' in response.json()['stages'].values():
+            break
+        time.sleep(0.05)
+    stages = client.get('/').json()['stages']
+    while any(v in ('pending', 'loading') for v in client.get('/').json()['stages'].values()):
+        time.sleep(0.05)
+
+print(json.dumps({
+    'import_s': import_s,
+    'heavy_at_import': heavy_at_import,
+    'accept_s': accept_s,
+    'live': live,
+    'ready_s': ready_s,
+    'stages': stages,
+    'shap_imported': 'shap' in sys.modules,
+}))
+"""
+
+def test_startup_time():
+    """Measure import and staged startup time of a prediction-only process (ENABLE_SHAP=0)"""
+    print("\n7. Testing Startup Time...")
+    
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE],
+            cwd=Path(__file__).parent,
+            env={**os.environ, "ENABLE_SHAP": "0"},
+            capture_output=True,
+            text=True,
+            timeout=180
+        )
+        if proc.returncode != 0:
+            print(f"   [ERROR] Startup probe failed: {proc.stderr.strip().splitlines()[-1:]}")
+            return False
+        data = json.loads(proc.stdout.strip().splitlines()[-1])
+    except Exception as e:
+        print(f"   [ERROR] {e}")
+        return False
+    
+    all_passed = True
+    print(f"   [OK] import api: {data['import_s']:.2f}s")
+    print(f"   [OK] Accepting traffic after: {data['accept_s']:.2f}s")
+    if data['heavy_at_import']:
+        print(f"   [ERROR] Heavy modules imported at import time: {data['heavy_at_import']}")
+        all_passed = False
+    if data['live'] != 200:
+        print(f"   [ERROR] Liveness probe returned {data['live']}")
+        all_passed = False
+    if data['ready_s'] is None:
+        print(f"   [WARNING] Never became ready, stages: {data['stages']}")
+        all_passed = False
+    else:
+        print(f"   [OK] Ready after: {data['ready_s']:.2f}s")
+    if data['shap_imported']:
+        print(f"   [ERROR] shap imported in a prediction-only process")
+        all_passed = False
+    
+    return all_passed
+
+def test_admission_recovery():
+    """Push the admission controller to reject and check that it recovers once the load is gone"""
+    print("\n8. Testing Load Shedding Recovery...")
+    from admission import AdmissionController, DEGRADATION_LEVELS, FULL, REJECT
+    
+    controller = AdmissionController(latency_ms_thresholds=(1, 2, 3), latency_half_life_s=0.05)
+    controller.enter()
+    controller.exit(100.0)
+    level = controller.enter()
+    if level != REJECT:
+        print(f"   [ERROR] Expected reject after a slow request, got {DEGRADATION_LEVELS[level]}")
+        return False
+    print(f"   [OK] Rejecting at latency average {controller.stats()['latency_ewma_ms']}ms")
+    
+    # nothing completes while rejecting; the latency average has to fade on its own
+    time.sleep(0.5)
+    level = controller.enter()
+    controller.exit(None)
+    if level != FULL:
+        print(f"   [ERROR] Still degraded after the load was gone: {controller.stats()}")
+        return False
+    print(f"   [OK] Back to full after load was gone")
+    return True
+
+SHEDDING_PROBE = """
+import json, time
+import api
+from fastapi.testclient import TestClient
+
+def push_latency(ms):
+    # with ewma_alpha=1 one finished request sets the latency average outright
+    api.admission.enter()
+    api.admission.exit(ms)
+
+api.admission.ewma_alpha = 1.0
+steps = []
+with TestClient(api.app) as client:
+    while True:
+        ready = client.get('/health/ready')
+        if ready.status_code == 200:
+            break
+        if 'failed' in ready.json()['stages'].values():
+            raise SystemExit(f"startup failed: {ready.json()['stages']}")
+        time.sleep(0.05)
+    for name, latency_ms, params in [
+        ('explainer_loading', 'explainer', 'city=Philadelphia&state=PA&subtype=Italian&price_range=2'),
+        ('full', None, 'city=Philadelphia&state=PA&subtype=Italian&price_range=2'),
+        ('no_explanations', 1500, 'city=Philadelphia&state=PA&subtype=Italian&price_range=2'),
+        ('cached_only', 2500, 'city=Philadelphia&state=PA&subtype=Italian&price_range=2'),
+        ('cached_only_miss', 2500, 'city=Tampa&state=FL&subtype=Thai&price_range=2'),
+        ('reject', 3500, 'city=Tampa&state=FL&subtype=Thai&price_range=2'),
+        ('recovered', 'wait', 'city=Tampa&state=FL&subtype=Thai&price_range=2'),
+    ]:
+        if latency_ms == 'explainer':
+            # as if SHAP were enabled and its explainer still loading
+            api.ENABLE_SHAP, api.stage_status['explainer'] = True, 'loading'
+        elif latency_ms == 'wait':
+            time.sleep(3)
+        elif latency_ms is not None:
+            push_latency(latency_ms)
+        response = client.get('/predict?' + params)
+        if latency_ms == 'explainer':
+            api.ENABLE_SHAP, api.stage_status['explainer'] = False, 'disabled'
+        body = response.json()
+        steps.append({
+            'step': name,
+            'status': response.status_code,
+            'header': response.headers.get('x-degradation-level'),
+            'level': body.get('degradation_level'),
+            'retry_after': response.headers.get('retry-after'),
+            'cache_control': response.headers.get('cache-control'),
+            'etag': response.headers.get('etag'),
+        })
+
+print(json.dumps(steps))
+"""
+
+def test_load_shedding():
+    """Drive /predict through every degradation level and back with low SHED_* thresholds"""
+    print("\n9. Testing Load Shedding...")
+    
+    env = {
+        **os.environ,
+        "ENABLE_SHAP": "0",
+        "SHED_INFLIGHT_THRESHOLDS": "1000,2000,3000",
+        "SHED_LATENCY_MS_THRESHOLDS": "1000,2000,3000",
+        "SHED_LATENCY_HALF_LIFE_S": "1",
+    }
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-c", SHEDDING_PROBE],
+            cwd=Path(__file__).parent,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=180
+        )
+        if proc.returncode != 0:
+            print(f"   [ERROR] Load shedding probe failed: {proc.stderr.strip().splitlines()[-1:]}")
+            return False
+        steps = json.loads(proc.stdout.strip().splitlines()[-1])
+    except Exception as e:
+        print(f"   [ERROR] {e}")
+        return False
+    
+    expected = {
+        "explainer_loading": (200, "no_explanations"),
+        "full": (200, "full"),
+        "no_explanations": (200, "no_explanations"),
+        "cached_only": (200, "cached_only"),
+        "cached_only_miss": (503, None),
+        "reject": (503, None),
+        "recovered": (200, "full"),
+    }
+    all_passed = True
+    for step in steps:
+        status, level = expected[step["step"]]
+        ok = step["status"] == status and step["header"] == level and step["level"] == level
+        if status == 503:
+            ok = ok and step["retry_after"] is not None
+        if step["step"] == "explainer_loading":
+            # never cacheable as a full response while top_features are missing
+            ok = ok and step["cache_control"] == "no-store" and step["etag"] is None
+        if ok:
+            print(f"   [OK] {step['step']}: {step['status']} {step['header'] or 'Retry-After: ' + step['retry_after']}")
+        else:
+            print(f"   [ERROR] {step['step']}: expected {status} {level}, got {step}")
+            all_passed = False
+    return all_passed
+
+PROFILING_PROBE = """
+import json, time
+import api
+from fastapi.testclient import TestClient
+
+token = {'X-Profile-Token': 'probe-token'}
+predict = '/predict?city=Tampa&state=FL&subtype=Thai&price_range=2'
+with TestClient(api.app) as client:
+    while True:
+        ready = client.get('/health/ready')
+        if ready.status_code == 200:
+            break
+        if 'failed' in ready.json()['stages'].values():
+            raise SystemExit(f"startup failed: {ready.json()['stages']}")
+        time.sleep(0.05)
+    
+    results = {
+        'list_without_token': client.get('/profiles').status_code,
+        'list_wrong_token': client.get('/profiles', headers={'X-Profile-Token': 'nope'}).status_code,
+        'list_query_token': client.get('/profiles?profile=probe-token').status_code,
+        'list_non_ascii_token': client.get('/profiles', headers={'X-Profile-Token': 'é'.encode('utf-8')}).status_code,
+        'non_ascii_token_predict': client.get(predict, headers={'X-Profile-Token': 'é'.encode('utf-8')}).status_code,
+        'query_token_profiled': 'x-profile-id' in client.get(predict + '&profile=probe-token').headers,
+    }
+    response = client.get(predict, headers=token)
+    profile_id = response.headers.get('x-profile-id')
+    results['header_token_profiled'] = profile_id is not None
+    results['profiled_cache_control'] = response.headers.get('cache-control')
+    profile = client.get(f'/profiles/{profile_id}', headers=token)
+    results['profile_status'] = profile.status_code
+    results['profile_has_breakdown'] = 'predict_proba' in profile.json().get('breakdown', {})
+    # the request-wide peak can never be below the peak of a single call inside it
+    results['peak_covers_breakdown'] = profile.json()['peak_traced_kb'] >= max(
+        row['peak_alloc_kb'] for row in profile.json()['breakdown'].values()
+    )
+    results['listed'] = [p['id'] for p in client.get('/profiles', headers=token).json()['profiles']] == [profile_id]
+    results['unknown_profile'] = client.get('/profiles/unknown', headers=token).status_code
+
+print(json.dumps(results))
+"""
+
+def test_profiling():
+    """Test the profiling token gate on /predict and /profiles"""
+    print("\n10. Testing Request Profiling...")
+    
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-c", PROFILING_PROBE],
+            cwd=Path(__file__).parent,
+            env={**os.environ, "ENABLE_SHAP": "0", "PROFILE_TOKEN": "probe-token", "PROFILE_SAMPLE_RATE": "0"},
+            capture_output=True,
+            text=True,
+            timeout=180
+        )
+        if proc.returncode != 0:
+            print(f"   [ERROR] Profiling probe failed: {proc.stderr.strip().splitlines()[-1:]}")
+            return False
+        results = json.loads(proc.stdout.strip().splitlines()[-1])
+    except Exception as e:
+        print(f"   [ERROR] {e}")
+        return False
+    
+    expected = {
+        "list_without_token": 403,
+        "list_wrong_token": 403,
+        "list_query_token": 403,
+        "list_non_ascii_token": 403,
+        "non_ascii_token_predict": 200,
+        "query_token_profiled": False,
+        "header_token_profiled": True,
+        "profiled_cache_control": "no-store",
+        "profile_status": 200,
+        "profile_has_breakdown": True,
+        "peak_covers_breakdown": True,
+        "listed": True,
+        "unknown_profile": 404,
+    }
+    all_passed = True
+    for check, value in expected.items():
+        if results.get(check) == value:
+            print(f"   [OK] {check}: {value}")
+        else:
+            print(f"   [ERROR] {check}: expected {value}, got {results.get(check)}")
+            all_passed = False
+    return all_passed
+
+REQUEST_LOG_PROBE = """
+import json, sys, time
+from pathlib import Path
+import api
+from fastapi.testclient import TestClient
+from request_log import read_log
+
+sent = {'GET /cities': 20, 'GET /subtypes': 10, 'POST /predict': 10}
+with TestClient(api.app) as client:
+    while True:
+        ready = client.get('/health/ready')
+        if ready.status_code == 200:
+            break
+        if 'failed' in ready.json()['stages'].values():
+            raise SystemExit(f"startup failed: {ready.json()['stages']}")
+        time.sleep(0.05)
+    for _ in range(sent['GET /cities']):
+        client.get('/cities')
+    for _ in range(sent['GET /subtypes']):
+        client.get('/subtypes')
+    for _ in range(sent['POST /predict']):
+        client.post('/predict', json={'city': 'Tampa', 'state': 'FL', 'subtype': 'Thai', 'price_range': 2.0})
+    dropped = client.get('/').json()['load'].get('request_log_dropped')
+# leaving the client runs shutdown, which drains the queue into the log
+
+path = api.request_logger.path
+files = sorted(path.parent.glob(path.name + '*'))
+records = read_log(files)
+logged = {}
+for r in records:
+    logged[f"{r['method']} {r['path']}"] = logged.get(f"{r['method']} {r['path']}", 0) + 1
+print(json.dumps({
+    'files': [f.name for f in files],
+    'logged': {k: logged.get(k, 0) for k in sent},
+    'sent': sent,
+    'ordered': [r['ts'] for r in records] == sorted(r['ts'] for r in records),
+    'dropped': dropped,
+}))
+"""
+
+REPLAY_PROBE = """
+import json, sys
+from pathlib import Path
+from replay import replay, summarize
+from request_log import read_log
+
+files = sys.argv[1:]
+records = [r for r in read_log(files) if r['path'] in ('/cities', '/subtypes', '/predict')]
+results, elapsed = replay(records, speed=0, concurrency=4)
+summary = summarize(results, elapsed)
+print(json.dumps({
+    endpoint: {k: s[k] for k in ('count', 'errors', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms')}
+    for endpoint, s in summary.items()
+}))
+"""
+
+def test_request_log_replay():
+    """Log traffic to a small rotating log, then replay it and check per-endpoint counts"""
+    print("\n11. Testing Request Log & Replay...")
+    
+    all_passed = True
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = Path(tmp) / "requests.jsonl"
+        env = {
+            **os.environ,
+            "ENABLE_SHAP": "0",
+            "REQUEST_LOG_PATH": str(log_path),
+            "REQUEST_LOG_MAX_BYTES": "2000",
+            "REQUEST_LOG_BACKUPS": "50",
+        }
+        try:
+            proc = subprocess.run(
+                [sys.executable, "-c", REQUEST_LOG_PROBE],
+                cwd=Path(__file__).parent, env=env, capture_output=True, text=True, timeout=180
+            )
+            if proc.returncode != 0:
+                print(f"   [ERROR] Request log probe failed: {proc.stderr.strip().splitlines()[-1:]}")
+                return False
+            logged = json.loads(proc.stdout.strip().splitlines()[-1])
+            
+            files = sorted(log_path.parent.glob(log_path.name + "*"))
+            env.pop("REQUEST_LOG_PATH")
+            proc = subprocess.run(
+                [sys.executable, "-c", REPLAY_PROBE] + [str(f) for f in files],
+                cwd=Path(__file__).parent, env=env, capture_output=True, text=True, timeout=180
+            )
+            if proc.returncode != 0:
+                print(f"   [ERROR] Replay probe failed: {proc.stderr.strip().splitlines()[-1:]}")
+                return False
+            summary = json.loads(proc.stdout.strip().splitlines()[-1])
+        except Exception as e:
+            print(f"   [ERROR] {e}")
+            return False
+    
+    if {"requests.jsonl.1", "requests.jsonl.2"} <= set(logged["files"]):
+        print(f"   [OK] Rotated into {len(logged['files'])} files")
+    else:
+        print(f"   [ERROR] Expected rotated .1/.2 files, got {logged['files']}")
+        all_passed = False
+    if logged["logged"] == logged["sent"] and logged["dropped"] == 0:
+        print(f"   [OK] Every request logged across rotated files: {logged['logged']}")
+    else:
+        print(f"   [ERROR] Logged {logged['logged']} (dropped {logged['dropped']}), sent {logged['sent']}")
+        all_passed = False
+    if not logged["ordered"]:
+        print(f"   [ERROR] read_log did not order records by timestamp")
+        all_passed = False
+    
+    for endpoint, count in logged["sent"].items():
+        stats = summary.get(endpoint, {})
+        percentiles = [stats.get(k) for k in ("p50_ms", "p90_ms", "p99_ms", "max_ms")]
+        if stats.get("count") == count and stats.get("errors") == 0 and percentiles == sorted(percentiles):
+            print(f"   [OK] Replayed {endpoint}: {count} requests, p50 {stats['p50_ms']:.1f}ms, p99 {stats['p99_ms']:.1f}ms")
+        else:
+            print(f"   [ERROR] Replay of {endpoint}: expected {count} requests without errors, got {stats}")
+            all_passed = False
+    if summary.get("ALL", {}).get("count") != sum(logged["sent"].values()):
+        print(f"   [ERROR] Replay total {summary.get('ALL')} != {sum(logged['sent'].values())}")
+        all_passed = False
+    return all_passed
+
+def _write_feature_fixture(directory, seed=7):
+    """Small synthetic Yelp business/review files and a Census DP05 CSV, with the messy values the real ones have"""
+    import random
+    import pandas as pd
+    
+    rng = random.Random(seed)
+    categories = ['Restaurants', 'Italian', 'Pizza', 'Fast Food', 'Breakfast & Brunch', 'Bars', 'Mexican',
+                  'Chinese', 'Coffee & Tea', 'Cafes', 'Food', 'Barbeque', 'Shopping', 'Nail Salons', 'Thai']
+    zip_codes = [f"{rng.randint(10000, 99999)}" for _ in range(40)]
+    businesses = []
+    for i in range(600):
+        zip_code = rng.choice(zip_codes)
+        businesses.append({
+            "business_id": f"b{i}", "name": "x", "address": "", "city": "C",
+            "state": rng.choice(["PA", "FL", "TN"]),
+            "postal_code": rng.choice([zip_code] * 4 + [zip_code + "-1234", "", None, "T5K 2J1", zip_code[:4]]),
+            "latitude": 1.0, "longitude": 2.0,
+            "stars": rng.choice([1, 2.5, 3, 4.5, 5]),
+            "review_count": rng.randint(1, 500), "is_open": 1,
+            "attributes": rng.choice([None, {}, {"RestaurantsPriceRange2": str(rng.randint(1, 4))},
+                                      {"RestaurantsPriceRange2": "None"}]),
+            "categories": None if rng.random() < 0.1 else ", ".join(rng.sample(categories, rng.randint(1, 4))),
+            "hours": None,
+        })
+    with open(Path(directory) / "business.json", "w") as f:
+        for business in businesses:
+            f.write(json.dumps(business) + "\n")
+    with open(Path(directory) / "review.json", "w") as f:
+        for i in range(5000):
+            f.write(json.dumps({
+                "review_id": f"r{i}", "business_id": rng.choice(businesses)["business_id"],
+                "stars": rng.randint(1, 5), "text": "t",
+                "date": f"{rng.randint(2005, 2022)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)} 12:00:00",
+            }) + "\n")
+    
+    # second row is the Census column description row the loader skips
+    census = [{"GEO_ID": "Geography", "NAME": "Area", "DP05_0001E": "x", "DP05_0018E": "x", "DP05_0037E": "x",
+               "DP05_0038E": "x", "DP05_0047E": "x", "DP05_0071E": "x"}]
+    for zip_code in zip_codes[:32]:
+        census.append({"GEO_ID": f"860Z200US{zip_code}", "NAME": zip_code,
+                       "DP05_0001E": rng.choice([0, 100, 5000, "N"]), "DP05_0018E": 35.5,
+                       "DP05_0037E": rng.randint(0, 90), "DP05_0038E": 3, "DP05_0047E": 4, "DP05_0071E": 5})
+    pd.DataFrame(census).to_csv(Path(directory) / "census.csv", index=False)
+
+def _notebook_features(directory):
+    """Literal port of the feature engineering in model/data_preprocessing_and_model.ipynb"""
+    import numpy as np
+    import pandas as pd
+    import feature_build as fb
+    
+    directory = Path(directory)
+    business = pd.DataFrame([json.loads(line) for line in open(directory / "business.json")])
+    business['categories'] = business['categories'].fillna('')
+    df = business[business['categories'].str.lower().str.contains('|'.join(fb.RESTAURANT_KEYWORDS))].copy()
+    
+    def extract_subtype(categories):
+        if pd.isna(categories) or categories == '':
+            return 'General'
+        for category in [c.strip().lower() for c in categories.split(',')]:
+            for cuisine in fb.CUISINE_TYPES:
+                if cuisine in category:
+                    return cuisine.title()
+        return 'General'
+    
+    def clean_zip(postal_code):
+        if pd.isna(postal_code):
+            return None
+        postal_code = str(postal_code).strip()
+        if '-' in postal_code:
+            postal_code = postal_code.split('-')[0]
+        postal_code = ''.join(filter(str.isdigit, postal_code))
+        return postal_code[:5] if len(postal_code) >= 5 else None
+    
+    df['subtype'] = df['categories'].apply(extract_subtype)
+    df['price_range'] = pd.to_numeric(df['attributes'].apply(
+        lambda a: a.get('RestaurantsPriceRange2') if isinstance(a, dict) else None), errors='coerce')
+    df['zip_code'] = df['postal_code'].apply(clean_zip)
+    df = df[df['zip_code'].notna()].copy()
+    
+    ids = set(df['business_id'])
+    reviews = pd.DataFrame([{k: r[k] for k in ('business_id', 'stars', 'date')}
+                            for r in map(json.loads, open(directory / "review.json")) if r['business_id'] in ids])
+    reviews['date'] = pd.to_datetime(reviews['date'])
+    review_agg = reviews.groupby('business_id').agg({'stars': ['mean', 'std', 'count'], 'date': ['min', 'max']}).reset_index()
+    review_agg.columns = ['business_id', 'avg_review_rating', 'std_review_rating', 'total_reviews',
+                          'first_review_date', 'last_review_date']
+    review_agg['business_age_years'] = (review_agg['last_review_date'] - review_agg['first_review_date']).dt.days / 365.25
+    df = df.merge(review_agg, on='business_id', how='left')
+    
+    zip_agg = df.groupby('zip_code').agg(
+        zip_avg_star_rating=('stars', 'mean'), zip_median_review_count=('review_count', 'median'),
+        zip_avg_price_range=('price_range', 'mean'), zip_median_business_age=('business_age_years', 'median'),
+        zip_total_restaurants=('business_id', 'count')).reset_index()
+    df = df.merge(zip_agg, on='zip_code', how='left')
+    
+    local = df.groupby(['zip_code', 'subtype']).agg(
+        local_subtype_avg_stars=('stars', 'mean'), local_subtype_total_restaurants=('business_id', 'count'),
+        local_subtype_avg_price=('price_range', 'mean'), local_subtype_median_reviews=('review_count', 'median'),
+        local_subtype_median_age=('business_age_years', 'median')).reset_index()
+    pivot = local.pivot_table(index='zip_code', columns='subtype', values=[
+        'local_subtype_avg_stars', 'local_subtype_total_restaurants', 'local_subtype_avg_price',
+        'local_subtype_median_reviews', 'local_subtype_median_age'])
+    pivot.columns = ['_'.join(c).strip() for c in pivot.columns.values]
+    renamed = {}
+    for col in pivot.columns:
+        parts = col.split('_')
+        stat = '_'.join(parts[:-1]).replace('local_subtype_', '').replace('restaurants', 'count')
+        renamed[col] = f"{parts[-1]}_{stat}_zip"
+    pivot = pivot.rename(columns=renamed).fillna(0)
+    df = df.merge(pivot, left_on='zip_code', right_index=True, how='left')
+    df[list(pivot.columns)] = df[list(pivot.columns)].fillna(0)
+    
+    census = pd.read_csv(directory / "census.csv", skiprows=[1])
+    census['zip_code'] = census['GEO_ID'].apply(lambda g: str(g).split('Z200US')[-1] if 'Z200US' in str(g) else None)
+    census = census[census['zip_code'].notna()]
+    demographics = census[['zip_code'] + list(fb.CENSUS_FEATURES)].copy()
+    demographics.columns = ['zip_code'] + list(fb.CENSUS_FEATURES.values())
+    for col in fb.CENSUS_FEATURES.values():
+        demographics[col] = pd.to_numeric(demographics[col], errors='coerce')
+    for group in ['white', 'black', 'asian', 'hispanic']:
+        demographics[f'pct_{group}'] = (demographics[f'{group}_population'] / demographics['total_population'] * 100).round(2)
+    pct_cols = ['pct_white', 'pct_black', 'pct_asian', 'pct_hispanic']
+    demographics[pct_cols] = demographics[pct_cols].replace([np.inf, -np.inf], 0).fillna(0)
+    df = df.merge(demographics, on='zip_code', how='left')
+    
+    def own_subtype_count(row):
+        col = f"{row['subtype']}_total_count_zip"
+        return row[col] if col in row.index else 0
+    
+    df['competition_density'] = df.apply(own_subtype_count, axis=1) / df['total_population']
+    df['market_share_of_competition'] = df.apply(own_subtype_count, axis=1) / df['zip_total_restaurants']
+    df['population_per_restaurant'] = df['total_population'] / df['zip_total_restaurants']
+    for col in fb.ENGINEERED_COLS:
+        df[col] = df[col].replace([np.inf, -np.inf], 0).fillna(0)
+    df['five_year_survivor'] = df['business_age_years'].apply(lambda age: 1 if age > 5 else 0)
+    
+    df = df.drop(columns=['business_id', 'name', 'address', 'city', 'state', 'postal_code', 'latitude', 'longitude',
+                          'stars', 'review_count', 'is_open', 'attributes', 'categories', 'hours',
+                          'avg_review_rating', 'std_review_rating', 'total_reviews', 'first_review_date',
+                          'last_review_date', 'business_age_years'])
+    competition_cols = [c for c in df.columns if c.endswith('_zip') and c not in fb.ZIP_AGG_COLS]
+    df[competition_cols] = df[competition_cols].fillna(0)
+    df['price_range'] = df['price_range'].fillna(df['price_range'].median())
+    return df.dropna(subset=fb.CENSUS_COLS).reset_index(drop=True)
+
+def test_feature_build():
+    """Check the partitioned feature build against the notebook and that reruns only rebuild changed partitions"""
+    print("\n12. Testing Feature Build...")
+    
+    import pandas as pd
+    import feature_build as fb
+    
+    all_passed = True
+    
+    def check(name, ok, detail=""):
+        nonlocal all_passed
+        if ok:
+            print(f"   [OK] {name}")
+        else:
+            print(f"   [ERROR] {name} {detail}")
+            all_passed = False
+    
+    subtypes = fb.extract_subtypes(pd.Series([
+        "Restaurants, Pizza, Italian", "Italian, Pizza", "Breakfast & Brunch, Cafes", "Fast Food", "Bars, Nightlife", "", None
+    ]))
+    expected = ["Pizza", "Italian", "Breakfast", "Fast Food", "General", "General", "General"]
+    check("extract_subtypes", subtypes.tolist() == expected, f"got {subtypes.tolist()}")
+    
+    zips = fb.clean_postal_codes(pd.Series(["19103", "19103-1234", " 33602 ", "191031234", "T5K 2J1", "1910", None]))
+    expected = ["19103", "19103", "33602", "19103", None, None, None]
+    check("clean_postal_codes", [z if isinstance(z, str) else None for z in zips] == expected, f"got {zips.tolist()}")
+    
+    restaurants = pd.DataFrame({"zip_code": ["19103", "19103", "19103", "19146", "08002"],
+                                "state": ["PA", "NJ", "PA", "PA", "NJ"]})
+    by_zip3 = fb.partition_keys(restaurants, "zip3").to_dict()
+    by_state = fb.partition_keys(restaurants, "state").to_dict()
+    check("partition_keys zip3", by_zip3 == {"19103": "191", "19146": "191", "08002": "080"}, f"got {by_zip3}")
+    check("partition_keys state", by_state == {"19103": "PA", "19146": "PA", "08002": "NJ"}, f"got {by_state}")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        _write_feature_fixture(tmp)
+        reference = _notebook_features(tmp)
+        restaurants = fb.load_restaurants(tmp / "business.json")
+        reviews = fb.load_reviews(tmp / "review.json", restaurants['business_id'], chunksize=1000)
+        demographics = fb.load_demographics(tmp / "census.csv")
+        
+        for scheme in ["zip3", "zip1", "state"]:
+            cache_dir = tmp / f"cache-{scheme}"
+            for run in ["first build", "cached rebuild"]:
+                built = fb.build_features(restaurants, reviews, demographics, scheme, 2, cache_dir)
+                try:
+                    pd.testing.assert_frame_equal(built, reference, check_dtype=False)
+                    check(f"{scheme} {run} matches notebook ({len(built)} rows)", True)
+                except AssertionError as e:
+                    check(f"{scheme} {run} matches notebook", False, str(e).splitlines()[0])
+        
+        # one changed review must rebuild exactly one partition and leave the rest cached
+        cache_dir = tmp / "cache-zip1"
+        before = {p.name: p.stat().st_mtime_ns for p in cache_dir.glob("*.pkl")}
+        reviews.loc[0, 'stars'] = 1 if reviews.loc[0, 'stars'] != 1 else 2
+        fb.build_features(restaurants, reviews, demographics, "zip1", 2, cache_dir)
+        after = {p.name: p.stat().st_mtime_ns for p in cache_dir.glob("*.pkl")}
+        rebuilt = set(after) - set(before)
+        untouched = all(after.get(name) == mtime for name, mtime in before.items() if name in after)
+        check(f"Incremental rebuild: {len(rebuilt)} of {len(after)} partitions rebuilt",
+              len(rebuilt) == 1 and len(after) == len(before) and untouched,
+              f"(before {sorted(before)}, after {sorted(after)})")
+    
+    return all_passed
+
 def main():
     print("=" * 60)
     print("Chef's Kiss API - Integration Test")
@@ -178,6 +915,60 @@ def main():
     # Test error handling
     test_invalid_requests()
     
+    # Test competition endpoint
+    if test_competition_endpoint():
+        print("\n[OK] Competition endpoint tests passed!")
+    else:
+        print("\n[WARNING] Some competition endpoint tests failed")
+    
+    # Test HTTP caching
+    if test_http_caching():
+        print("\n[OK] HTTP caching tests passed!")
+    else:
+        print("\n[WARNING] Some HTTP caching tests failed")
+    
+    # Test nearby endpoint
+    if test_nearby_endpoint():
+        print("\n[OK] Nearby endpoint tests passed!")
+    else:
+        print("\n[WARNING] Some nearby endpoint tests failed")
+    
+    # Test startup time (runs the app in-process, no server needed)
+    if test_startup_time():
+        print("\n[OK] Startup time tests passed!")
+    else:
+        print("\n[WARNING] Some startup time tests failed")
+    
+    # Test load shedding recovery (in-process, no server needed)
+    if test_admission_recovery():
+        print("\n[OK] Load shedding recovery tests passed!")
+    else:
+        print("\n[WARNING] Some load shedding recovery tests failed")
+    
+    # Test load shedding levels (runs the app in-process, no server needed)
+    if test_load_shedding():
+        print("\n[OK] Load shedding tests passed!")
+    else:
+        print("\n[WARNING] Some load shedding tests failed")
+    
+    # Test request profiling (runs the app in-process, no server needed)
+    if test_profiling():
+        print("\n[OK] Request profiling tests passed!")
+    else:
+        print("\n[WARNING] Some request profiling tests failed")
+    
+    # Test request log rotation and replay (runs the app in-process, no server needed)
+    if test_request_log_replay():
+        print("\n[OK] Request log & replay tests passed!")
+    else:
+        print("\n[WARNING] Some request log & replay tests failed")
+    
+    # Test the partitioned feature build (synthetic data, no server or model needed)
+    if test_feature_build():
+        print("\n[OK] Feature build tests passed!")
+    else:
+        print("\n[WARNING] Some feature build tests failed")
+    
     print("\n" + "=" * 60)
     print("[OK] Integration tests complete!")
     print("=" * 60)
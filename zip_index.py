@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+ZIP Spatial Index
+ZIP code centroids computed offline from Yelp business coordinates and stored
+as a compact .npz (zip codes plus float32 latitude/longitude). At load time the
+centroids go into a haversine ball tree, so nearest-ZIP lookups by coordinates
+take logarithmic rather than linear time.
+
+Usage:
+    python zip_index.py [--business yelp_dataset/yelp_academic_dataset_business.json]
+        [--output zip_centroids.npz]
+"""
+
+import argparse
+import hashlib
+import sys
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_INDEX_FILE = "zip_centroids.npz"
+EARTH_RADIUS_MILES = 3958.8
+
+
+class ZipIndex:
+    """
+    ZIP centroids as parallel arrays plus a ball tree over them:
+    - zip_codes: 5-digit strings
+    - latitudes / longitudes: degrees, float32
+    - restaurant_counts: restaurants each centroid was computed from
+    """
+
+    def __init__(self, zip_codes: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray,
+                 restaurant_counts: np.ndarray, version: Optional[str] = None):
+        from sklearn.neighbors import BallTree
+
+        self.zip_codes = zip_codes.astype("<U5")
+        self.latitudes = latitudes.astype(np.float32)
+        self.longitudes = longitudes.astype(np.float32)
+        self.restaurant_counts = restaurant_counts.astype(np.int32)
+        self.version = version
+        self.tree = BallTree(np.radians(np.column_stack([self.latitudes, self.longitudes])), metric="haversine")
+
+    @classmethod
+    def from_restaurants(cls, restaurants) -> "ZipIndex":
+        """
+        Centroids from restaurant rows with zip_code, latitude and longitude.
+        Uses the median position per ZIP so a few mis-geocoded businesses
+        do not drag the centroid away.
+        """
+        located = restaurants.dropna(subset=["zip_code", "latitude", "longitude"])
+        grouped = located.groupby("zip_code").agg(
+            latitude=("latitude", "median"),
+            longitude=("longitude", "median"),
+            restaurant_count=("latitude", "size"),
+        )
+        return cls(
+            grouped.index.to_numpy(dtype=str),
+            grouped["latitude"].to_numpy(),
+            grouped["longitude"].to_numpy(),
+            grouped["restaurant_count"].to_numpy(),
+        )
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_FILE) -> "ZipIndex":
+        """Load centroids saved with save()"""
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"ZIP index not found: {path} (build it with: python zip_index.py)")
+        with np.load(path) as data:
+            return cls(
+                data["zip_codes"], data["latitudes"], data["longitudes"], data["restaurant_counts"],
+                version=hashlib.sha256(path.read_bytes()).hexdigest()[:12],
+            )
+
+    def save(self, path=DEFAULT_INDEX_FILE):
+        np.savez_compressed(
+            path,
+            zip_codes=self.zip_codes,
+            latitudes=self.latitudes,
+            longitudes=self.longitudes,
+            restaurant_counts=self.restaurant_counts,
+        )
+
+    def subset(self, zip_codes: Iterable[str]) -> "ZipIndex":
+        """Index over only the given ZIP codes (e.g. the ones the model has context for)"""
+        keep = np.isin(self.zip_codes, np.asarray(list(zip_codes), dtype="<U5"))
+        return ZipIndex(self.zip_codes[keep], self.latitudes[keep], self.longitudes[keep],
+                        self.restaurant_counts[keep], version=self.version)
+
+    def __len__(self):
+        return len(self.zip_codes)
+
+    def nearest(self, latitude: float, longitude: float, k: int,
+                radius_miles: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Up to k ZIP codes closest to a point, nearest first, optionally limited
+        to those within radius_miles. Returns (zip_codes, distances_miles).
+        """
+        k = min(k, len(self))
+        if k == 0:
+            return self.zip_codes[:0], np.empty(0)
+        distances, rows = self.tree.query(np.radians([[latitude, longitude]]), k=k)
+        distances = distances[0] * EARTH_RADIUS_MILES
+        rows = rows[0]
+        if radius_miles is not None:
+            within = distances <= radius_miles
+            distances, rows = distances[within], rows[within]
+        return self.zip_codes[rows], distances
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build ZIP centroids from Yelp business coordinates")
+    parser.add_argument("--business", default="yelp_dataset/yelp_academic_dataset_business.json",
+                        help="Yelp business JSON lines file")
+    parser.add_argument("--output", default=DEFAULT_INDEX_FILE, help="Output .npz path")
+    args = parser.parse_args()
+
+    if not Path(args.business).exists():
+        print(f"[ERROR] Input not found: {args.business}")
+        return 1
+
+    # same restaurant filter and zip cleaning as the feature build, so the ZIPs line up
+    from feature_build import load_restaurants
+
+    index = ZipIndex.from_restaurants(load_restaurants(args.business))
+    index.save(args.output)
+    print(f"[OK] Wrote centroids for {len(index)} zip codes to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())